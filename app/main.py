@@ -1,13 +1,16 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
-from typing import List, Optional, Union
+from fastapi.encoders import jsonable_encoder
+from typing import Any, List, Optional, Union, Dict, Set, Tuple
+from collections import Counter
 import json
 import pandas as pd
 import io
 from datetime import datetime
 import asyncio
+import os
 import random
 import time
 
@@ -18,13 +21,26 @@ from .models import (
     AnalysisStats,
     URLRequest,
     MultiURLRequest,
+    MLPrediction,
+    URLCrawlResult,
+    SamplingEstimate,
+    WatchRequest,
     ErrorResponse
 )
 from .services.tiktok_service import TikTokService
 from .services.ml_service import MLService
+from .services.inference_scheduler import InferenceScheduler
 from .services.data_processor import DataProcessor
 from .services.validation_service import ValidationService
 from .services.cache_service import cache_service
+from .services.cache_codec import CachedPayload
+from .services.cache_snapshot import CacheSnapshot
+from .services.crawl_state import VideoCrawlState
+from .services.crawl_pipeline import CrawlPipeline
+from .services.adaptive_sampler import AdaptiveSampler
+from .services.single_flight import SingleFlight
+from .services.comment_archive import CommentArchive
+from .services.watch_list import WatchListService
 from .middleware.rate_limiter import RateLimitMiddleware
 from .utils.logger import logger, log_api_request, log_api_response, log_error
 from .utils.helpers import paginate_results, validate_file_size
@@ -58,12 +74,60 @@ app.add_middleware(
 # Initialize services
 tiktok_service = TikTokService()
 ml_service = MLService()
+inference_scheduler = InferenceScheduler(
+    ml_service,
+    max_batch_size=settings.scheduler_max_batch_size,
+    max_wait_ms=settings.scheduler_max_wait_ms,
+    max_in_flight=settings.scheduler_max_in_flight,
+    enabled=settings.scheduler_enabled
+)
 data_processor = DataProcessor()
-validation_service = ValidationService()
+validation_service = ValidationService(
+    short_link_cache_size=settings.short_link_cache_size,
+    resolve_timeout=settings.short_link_resolve_timeout,
+    proxies=settings.httpx_proxies
+)
+crawl_pipeline = CrawlPipeline(
+    data_processor,
+    inference_scheduler,
+    queue_size=settings.crawl_pipeline_queue_size,
+    batch_size=settings.crawl_pipeline_batch_size,
+    max_wait_ms=settings.crawl_pipeline_max_wait_ms,
+    max_in_flight=settings.crawl_pipeline_max_in_flight
+)
+adaptive_sampler = AdaptiveSampler(
+    data_processor,
+    inference_scheduler,
+    batch_size=settings.sampling_batch_size,
+    min_comments=settings.sampling_min_comments,
+    confidence_level=settings.sampling_confidence_level
+)
 
 # Global storage for results (in production, use a database)
 analysis_results = {}
 
+# Snapshot cache + kết quả phân tích khi tắt, nạp lại ở background khi khởi động
+cache_snapshot = CacheSnapshot(settings.cache_snapshot_path, cache_service, analysis_results)
+
+# Gộp các request đồng thời cho cùng một video vào một lần crawl/phân tích
+single_flight = SingleFlight()
+
+# Lưu trữ bình luận thô trên đĩa để chấm lại mà không cần crawl lại
+comment_archive = CommentArchive(
+    settings.comment_archive_dir,
+    max_age=settings.comment_archive_max_age,
+    keep_per_video=settings.comment_archive_keep_per_video
+)
+
+# Video được theo dõi, làm mới định kỳ ở background
+watch_list = WatchListService(
+    lambda url: _refresh_url(url),
+    path=os.path.join(settings.crawl_state_dir, "watch_list.json"),
+    default_interval=settings.watch_default_interval,
+    min_interval=settings.watch_min_interval,
+    max_concurrency=settings.watch_max_concurrency
+)
+
 # Request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -133,11 +197,15 @@ async def root():
         "status": "operational",
         "endpoints": {
             "predict_url": "/predict/url",
+            "predict_url_stream": "/predict/url/stream",
             "predict_urls": "/predict/urls", 
             "predict_file": "/predict/file",
             "stats": "/stats",
             "download": "/download/{analysis_id}",
             "health": "/health",
+            "watchlist": "/watchlist",
+            "token_state": "/admin/tokens",
+            "proxy_state": "/admin/proxies",
             "docs": "/docs"
         },
         "features": [
@@ -158,8 +226,13 @@ async def health_check():
     # Check ML service
     try:
         model_info = await ml_service.get_model_info()
-        ml_status = "operational"
+        ml_backend = ml_service.get_backend_health()
+        if ml_backend["circuit_breaker"]["state"] == "open":
+            ml_status = "degraded (circuit open, using heuristic fallback)"
+        else:
+            ml_status = "operational"
     except Exception as e:
+        ml_backend = None
         ml_status = f"error: {str(e)}"
     
     return {
@@ -174,54 +247,59 @@ async def health_check():
         },
         "system": {
             "cache_stats": cache_stats,
+            "cache_snapshot_stats": cache_snapshot.get_stats(),
+            "ml_backend": ml_backend,
+            "scheduler_stats": inference_scheduler.get_stats(),
+            "crawl_pipeline_stats": crawl_pipeline.get_stats(),
+            "adaptive_sampler_stats": adaptive_sampler.get_stats(),
+            "single_flight_stats": single_flight.get_stats(),
+            "short_link_stats": validation_service.get_short_link_stats(),
+            "comment_archive_stats": comment_archive.get_stats(),
+            "tiktok_session_pool": tiktok_service.get_session_pool_stats(),
+            "proxy_pool": tiktok_service.get_proxy_state(),
+            "prediction_cache_stats": ml_service.prediction_cache.get_stats() if ml_service.prediction_cache else None,
             "analysis_count": len(analysis_results)
         }
     }
 
 @app.post("/predict/url", response_model=PredictionResponse)
-async def predict_from_url(request: URLRequest):
+async def predict_from_url(request: URLRequest, http_request: Request):
     """Analyze comments from a single TikTok URL"""
     try:
-        # Validate URL
-        validation = validation_service.validate_tiktok_url(request.url)
-        if not validation['valid']:
-            raise HTTPException(status_code=400, detail=validation['error'])
+        # Validate URL and resolve it to its video id
+        video = await validation_service.canonicalize_tiktok_url(request.url)
+        if not video['valid']:
+            raise HTTPException(status_code=400, detail=video['error'])
         
-        # Check cache
-        cache_key = f"url:{request.url}"
-        cached_result = await cache_service.get(cache_key)
+        # Check cache (a full analysis also answers a sampling request)
+        cached_result, stale = await cache_service.lookup(_video_cache_key(video['video_id']))
         if cached_result:
-            logger.info("Returning cached result for URL analysis")
-            return cached_result
-        
-        # Extract comments from TikTok URL
-        comments_data = await tiktok_service.extract_comments(request.url)
-        
-        # Process and predict
-        comments = await data_processor.process_comments(comments_data)
-        if not comments:
-            raise HTTPException(status_code=404, detail="Không tìm thấy bình luận nào từ URL này")
-        
-        predictions = await ml_service.predict_batch([c.comment_text for c in comments])
-        
-        # Combine results
-        for i, comment in enumerate(comments):
-            comment.prediction = predictions[i].label
-            comment.confidence = predictions[i].confidence
-        
-        # Generate analysis
-        result = await _generate_analysis_result(comments, request.url)
-        
-        # Store result
-        analysis_id = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random.randint(1000, 9999)}"
-        analysis_results[analysis_id] = result
-        result.analysis_id = analysis_id
-        
-        # Cache result
-        await cache_service.set(cache_key, result, ttl=settings.cache_ttl)
+            if stale:
+                # Serve the stale analysis now and refresh it once in the background
+                cache_service.revalidate(
+                    _video_cache_key(video['video_id']),
+                    lambda: _refresh_url(video['canonical_url'])
+                )
+            logger.info(f"Returning {'stale ' if stale else ''}cached result for URL analysis")
+            return _cached_response(cached_result, http_request, stale)
+        
+        if request.sample:
+            margin = request.margin or settings.sampling_default_margin
+            sample_key = _sample_cache_key(video['video_id'], margin)
+            cached_result = await cache_service.get_payload(sample_key)
+            if cached_result:
+                logger.info("Returning cached sampling estimate for URL analysis")
+                return _cached_response(cached_result, http_request)
+            return await single_flight.do(
+                sample_key,
+                lambda: _sample_url(video['canonical_url'], video['video_id'], margin)
+            )
         
-        logger.info(f"URL analysis completed: {len(comments)} comments processed")
-        return result
+        # Concurrent requests for the same video share one analysis
+        return await single_flight.do(
+            f"analysis:{video['video_id']}",
+            lambda: _analyze_url(video['canonical_url'], video['video_id'])
+        )
         
     except HTTPException:
         raise
@@ -229,43 +307,98 @@ async def predict_from_url(request: URLRequest):
         log_error(e, context="predict_from_url")
         raise HTTPException(status_code=500, detail=f"Lỗi xử lý URL: {str(e)}")
 
+@app.post("/predict/url/stream")
+async def predict_from_url_stream(request: URLRequest):
+    """Analyze comments from a single TikTok URL, streaming predictions as NDJSON"""
+    video = await validation_service.canonicalize_tiktok_url(request.url)
+    if not video['valid']:
+        raise HTTPException(status_code=400, detail=video['error'])
+    
+    try:
+        comments_data = await tiktok_service.extract_comments(video['canonical_url'])
+        comments = await data_processor.process_comments(comments_data)
+    except Exception as e:
+        log_error(e, context="predict_from_url_stream")
+        raise HTTPException(status_code=500, detail=f"Lỗi xử lý URL: {str(e)}")
+    
+    if not comments:
+        raise HTTPException(status_code=404, detail="Không tìm thấy bình luận nào từ URL này")
+    
+    async def stream_predictions():
+        predictions: List[Optional[MLPrediction]] = [None] * len(comments)
+        try:
+            # Mỗi dòng là một bình luận đã được chấm, theo thứ tự hoàn thành
+            async for index, prediction in ml_service.predict_stream(c.comment_text for c in comments):
+                comment = comments[index]
+                comment.prediction = prediction.label
+                comment.confidence = prediction.confidence
+                predictions[index] = prediction
+                yield json.dumps({
+                    "type": "comment",
+                    "index": index,
+                    "comment_id": comment.comment_id,
+                    "prediction": prediction.label,
+                    "confidence": prediction.confidence
+                }, ensure_ascii=False) + "\n"
+            
+            result = await _generate_analysis_result(comments, request.url, predictions)
+            analysis_id = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random.randint(1000, 9999)}"
+            analysis_results[analysis_id] = result
+            result.analysis_id = analysis_id
+            await _cache_analysis(video['video_id'], result)
+            
+            yield json.dumps({
+                "type": "summary",
+                "analysis_id": analysis_id,
+                "stats": result.stats.model_dump(),
+                "keywords": result.keywords,
+                "routing": result.routing
+            }, ensure_ascii=False) + "\n"
+            logger.info(f"Streaming URL analysis completed: {len(comments)} comments processed")
+            
+        except Exception as e:
+            log_error(e, context="predict_from_url_stream")
+            yield json.dumps({"type": "error", "detail": f"Lỗi xử lý URL: {str(e)}"}, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(stream_predictions(), media_type="application/x-ndjson")
+
 @app.post("/predict/urls", response_model=PredictionResponse)
 async def predict_from_urls(request: MultiURLRequest):
     """Analyze comments from multiple TikTok URLs"""
     try:
-        if len(request.urls) > 10:
-            raise HTTPException(status_code=400, detail="Tối đa 10 URL mỗi lần")
+        if len(request.urls) > settings.max_urls_per_request:
+            raise HTTPException(status_code=400, detail=f"Tối đa {settings.max_urls_per_request} URL mỗi lần")
         
-        # Validate all URLs
-        for url in request.urls:
-            validation = validation_service.validate_tiktok_url(url)
-            if not validation['valid']:
+        # Validate all URLs and resolve them to video ids
+        videos = await asyncio.gather(*[validation_service.canonicalize_tiktok_url(url) for url in request.urls])
+        for url, video in zip(request.urls, videos):
+            if not video['valid']:
                 raise HTTPException(status_code=400, detail=f"URL không hợp lệ: {url}")
         
-        all_comments = []
+        # Crawl and predict URLs concurrently, at most one per available TikTok session
+        semaphore = asyncio.Semaphore(_url_crawl_concurrency())
+        crawled = await asyncio.gather(*[
+            _crawl_url(url, video, semaphore) for url, video in zip(request.urls, videos)
+        ])
         
-        # Process each URL
-        for url in request.urls:
-            try:
-                comments_data = await tiktok_service.extract_comments(url)
-                comments = await data_processor.process_comments(comments_data)
-                all_comments.extend(comments)
-            except Exception as e:
-                logger.warning(f"Failed to process URL {url}: {str(e)}")
-                continue
+        all_comments = []
+        predictions = []
+        url_results = []
+        stored = 0
+        for comments, url_predictions, reused, url_result in crawled:
+            all_comments.extend(comments)
+            predictions.extend(url_predictions)
+            stored += reused
+            url_results.append(url_result)
         
         if not all_comments:
             raise HTTPException(status_code=404, detail="Không tìm thấy bình luận nào từ các URL")
         
-        # Batch prediction
-        predictions = await ml_service.predict_batch([c.comment_text for c in all_comments])
-        
-        for i, comment in enumerate(all_comments):
-            comment.prediction = predictions[i].label
-            comment.confidence = predictions[i].confidence
-        
         # Generate analysis
-        result = await _generate_analysis_result(all_comments, f"{len(request.urls)} URLs")
+        result = await _generate_analysis_result(all_comments, f"{len(request.urls)} URLs", predictions)
+        if stored:
+            result.routing = {**(result.routing or {}), "stored": stored}
+        result.url_results = url_results
         
         # Store result
         analysis_id = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random.randint(1000, 9999)}"
@@ -330,14 +463,14 @@ async def predict_from_file(file: UploadFile = File(...)):
             )
         
         # Batch prediction
-        predictions = await ml_service.predict_batch([c.comment_text for c in comments])
+        predictions = await inference_scheduler.predict([c.comment_text for c in comments])
         
         for i, comment in enumerate(comments):
             comment.prediction = predictions[i].label
             comment.confidence = predictions[i].confidence
         
         # Generate analysis
-        result = await _generate_analysis_result(comments, file.filename)
+        result = await _generate_analysis_result(comments, file.filename, predictions)
         
         # Store result
         analysis_id = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random.randint(1000, 9999)}"
@@ -506,7 +639,52 @@ async def clear_cache():
     await cache_service.clear()
     return {"message": "Cache đã được xóa"}
 
-async def _generate_analysis_result(comments: List[Comment], source: str) -> PredictionResponse:
+@app.post("/watchlist")
+async def add_to_watch_list(request: WatchRequest):
+    """Track a video and refresh its analysis periodically in the background"""
+    if not settings.watch_list_enabled:
+        raise HTTPException(status_code=400, detail="Watch list đang bị tắt")
+    
+    video = await validation_service.canonicalize_tiktok_url(request.url)
+    if not video['valid']:
+        raise HTTPException(status_code=400, detail=video['error'])
+    
+    entry = await watch_list.add(video['canonical_url'], request.interval)
+    logger.info(f"Watching {entry.url} every {entry.interval}s")
+    return entry.to_dict()
+
+@app.get("/watchlist")
+async def get_watch_list():
+    """List tracked videos and their last refresh"""
+    return {"videos": watch_list.list(), **watch_list.get_stats()}
+
+@app.delete("/watchlist")
+async def remove_from_watch_list(url: str):
+    """Stop tracking a video"""
+    video = await validation_service.canonicalize_tiktok_url(url)
+    removed = await watch_list.remove(video['canonical_url']) if video['valid'] else False
+    if not removed and not await watch_list.remove(url):
+        raise HTTPException(status_code=404, detail="URL không có trong watch list")
+    return {"message": "Đã bỏ theo dõi video"}
+
+@app.get("/admin/tokens")
+async def get_token_state():
+    """msToken health: success rate, latency, recent failures and cooldowns"""
+    return {
+        "tokens": tiktok_service.get_token_state(),
+        "session_pool": tiktok_service.get_session_pool_stats()
+    }
+
+@app.get("/admin/proxies")
+async def get_proxy_state():
+    """Proxy health: probe results, latency, error rate and sessions per proxy"""
+    return tiktok_service.get_proxy_state()
+
+async def _generate_analysis_result(
+    comments: List[Comment],
+    source: str,
+    predictions: Optional[List[MLPrediction]] = None
+) -> PredictionResponse:
     """Generate comprehensive analysis result"""
     total = len(comments)
     seeding_count = len([c for c in comments if c.prediction == 1])
@@ -529,22 +707,282 @@ async def _generate_analysis_result(comments: List[Comment], source: str) -> Pre
         stats=stats,
         keywords=keywords,
         source=source,
-        processed_at=datetime.now().isoformat()
+        processed_at=datetime.now().isoformat(),
+        routing=_count_routing(predictions) if predictions else None
+    )
+
+def _count_routing(predictions: List[MLPrediction]) -> Dict[str, int]:
+    """Count predictions per stage (cache, heuristic, model, fallback, simulation)"""
+    return dict(Counter(p.stage or "unknown" for p in predictions))
+
+def _apply_predictions(comments: List[Comment], predictions: List[MLPrediction]) -> None:
+    for comment, prediction in zip(comments, predictions):
+        comment.prediction = prediction.label
+        comment.confidence = prediction.confidence
+
+def _video_cache_key(video_id: str) -> str:
+    """Cache key of a video's analysis; every URL form of a video maps to it"""
+    return f"video:{video_id}"
+
+def _cached_response(cached, http_request: Request, stale: bool = False):
+    """Serve a cache entry; compact entries are sent as stored bytes without building the model.
+
+    Stale entries are marked with ``X-Cache-Status: stale`` and a ``Warning: 110`` header.
+    """
+    headers = {"X-Cache-Status": "stale", "Warning": '110 - "Response is Stale"'} if stale else {}
+    if not isinstance(cached, CachedPayload):
+        if not headers:
+            return cached
+        return JSONResponse(content=jsonable_encoder(cached), headers=headers)
+    if cached.encoding == "none":
+        return Response(content=cached.data, media_type="application/json", headers=headers)
+    accepted = [e.split(';')[0].strip() for e in http_request.headers.get("accept-encoding", "").split(',')]
+    if cached.encoding in accepted:
+        return Response(
+            content=cached.data,
+            media_type="application/json",
+            headers={**headers, "Content-Encoding": cached.encoding, "Vary": "Accept-Encoding"}
+        )
+    return Response(content=cached.json_bytes(), media_type="application/json", headers=headers)
+
+async def _cache_analysis(video_id: str, result: PredictionResponse) -> None:
+    """Cache a full video analysis; it is served stale for cache_stale_ttl after cache_ttl"""
+    await cache_service.set(
+        _video_cache_key(video_id), result, ttl=settings.cache_ttl, stale_ttl=settings.cache_stale_ttl
     )
 
+def _sample_cache_key(video_id: str, margin: float) -> str:
+    """Cache key of a sampling estimate; kept apart so it never answers a full analysis request"""
+    return f"video:{video_id}:sample:{margin:g}"
+
+def _comment_unix_time(comment: Comment) -> float:
+    try:
+        return datetime.fromisoformat(comment.timestamp.replace('Z', '+00:00')).timestamp()
+    except (ValueError, AttributeError):
+        return 0.0
+
+async def _fetch_and_score(
+    url: str,
+    seen_ids: Optional[Set[str]] = None,
+    newest_timestamp: Optional[float] = None
+) -> Tuple[List[Comment], List[MLPrediction]]:
+    """Crawl (new) comments of a video and predict them, pipelined when enabled"""
+    if settings.crawl_pipeline_enabled:
+        comments, predictions = await crawl_pipeline.run(
+            tiktok_service.stream_comments(url, seen_ids=seen_ids, newest_timestamp=newest_timestamp)
+        )
+    else:
+        comments = await data_processor.process_comments(
+            await tiktok_service.extract_comments(url, seen_ids=seen_ids, newest_timestamp=newest_timestamp)
+        )
+        predictions = await inference_scheduler.predict([c.comment_text for c in comments]) if comments else []
+    _apply_predictions(comments, predictions)
+    return comments, predictions
+
+async def _crawl_video(
+    url: str,
+    video_id: str,
+    use_archive: bool = True
+) -> Tuple[List[Comment], List[MLPrediction], int]:
+    """Crawl and score a video, sharing the work with concurrent callers for the same video"""
+    key = f"crawl:{video_id}" if use_archive else f"recrawl:{video_id}"
+    return await single_flight.do(key, lambda: _crawl_and_score_url(url, video_id, use_archive))
+
+async def _archive_comments(video_key: str, comments: List[Comment]) -> None:
+    if settings.comment_archive_enabled and comments:
+        await comment_archive.write(
+            video_key, [c.model_dump(exclude={'prediction', 'confidence'}) for c in comments]
+        )
+
+async def _crawl_and_score_url(
+    url: str,
+    video_key: str,
+    use_archive: bool = True
+) -> Tuple[List[Comment], List[MLPrediction], int]:
+    """Crawl a video and score its comments.
+
+    A fresh crawl in the comment archive is re-scored without touching
+    TikTok. With incremental crawling only comments not seen before are
+    fetched and scored, then merged with the predictions stored for the
+    video. Returns (all comments, predictions of the scored comments, number
+    of stored comments reused).
+    """
+    if use_archive and settings.comment_archive_enabled:
+        archived = await comment_archive.latest(video_key)
+        if archived is not None:
+            crawled_at, comments_data = archived
+            comments = await data_processor.process_comments(comments_data)
+            predictions = await inference_scheduler.predict([c.comment_text for c in comments]) if comments else []
+            _apply_predictions(comments, predictions)
+            logger.info(f"Re-scored {len(comments)} archived comments of {video_key} crawled at {crawled_at.isoformat()}")
+            return comments, predictions, 0
+    
+    if not settings.incremental_crawl_enabled:
+        comments, predictions = await _fetch_and_score(url)
+        await _archive_comments(video_key, comments)
+        return comments, predictions, 0
+    
+    store = tiktok_service.crawl_state
+    async with store.lock(video_key):
+        state = await store.load(video_key)
+        if state is None:
+            state = VideoCrawlState(video_key=video_key, url=url)
+            new_comments, predictions = await _fetch_and_score(url)
+        else:
+            # Every Nth crawl walks the whole list to pick up comments the early stop skipped
+            full_every = settings.incremental_full_recrawl_every
+            full_recrawl = full_every > 0 and (state.crawl_count + 1) % full_every == 0
+            new_comments, predictions = await _fetch_and_score(
+                url,
+                seen_ids=state.seen_ids,
+                newest_timestamp=None if full_recrawl else state.newest_timestamp
+            )
+        
+        reused = [Comment(**c) for c in state.comments]
+        model_changed = bool(reused) and state.model_tag != ml_service.model_tag
+        if model_changed:
+            # Stored predictions come from another model version: score them again
+            rescored = await inference_scheduler.predict([c.comment_text for c in reused])
+            _apply_predictions(reused, rescored)
+            predictions = predictions + rescored
+        comments = new_comments + reused
+        
+        if new_comments or model_changed:
+            state.url = url
+            state.seen_ids.update(c.comment_id for c in new_comments if c.comment_id)
+            state.newest_timestamp = max([state.newest_timestamp] + [_comment_unix_time(c) for c in new_comments])
+            state.comments = [c.model_dump() for c in comments]
+            state.model_tag = ml_service.model_tag
+        # Saved even without changes: crawl_count drives the periodic full recrawl
+        await store.save(state)
+        if new_comments:
+            await _archive_comments(video_key, comments)
+    
+    logger.info(f"Incremental crawl of {video_key}: {len(new_comments)} new, {len(reused)} stored comments")
+    return comments, predictions, 0 if model_changed else len(reused)
+
+async def _refresh_url(url: str) -> Dict[str, Any]:
+    """Background refresh of a video (watch list, stale cache entry); recrawls and updates the cached analysis"""
+    video = await validation_service.canonicalize_tiktok_url(url)
+    if not video['valid']:
+        raise ValueError(video['error'])
+    
+    comments, predictions, reused = await _crawl_video(video['canonical_url'], video['video_id'], use_archive=False)
+    analysis_id = None
+    if comments:
+        result = await _generate_analysis_result(comments, url, predictions)
+        if reused:
+            result.routing = {**(result.routing or {}), "stored": reused}
+        
+        # Store like _analyze_url so /analysis and /download work for the refreshed result
+        analysis_id = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random.randint(1000, 9999)}"
+        analysis_results[analysis_id] = result
+        result.analysis_id = analysis_id
+        await _cache_analysis(video['video_id'], result)
+    return {
+        "analysis_id": analysis_id,
+        "total_comments": len(comments),
+        "scored_comments": len(predictions),
+        "seeding": sum(1 for c in comments if c.prediction == 1)
+    }
+
+def _url_crawl_concurrency() -> int:
+    """Parallel crawls for /predict/urls, capped by the TikTok session pool"""
+    limit = settings.url_crawl_concurrency or tiktok_service.max_concurrent_crawls
+    return max(1, min(limit, tiktok_service.max_concurrent_crawls))
+
+async def _crawl_url(
+    url: str,
+    video: Dict[str, str],
+    semaphore: asyncio.Semaphore
+) -> Tuple[List[Comment], List[MLPrediction], int, URLCrawlResult]:
+    """Crawl and predict one URL; failures are reported instead of raised"""
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            comments, predictions, reused = await _crawl_video(video['canonical_url'], video['video_id'])
+        except Exception as e:
+            logger.warning(f"Failed to process URL {url}: {str(e)}")
+            return [], [], 0, URLCrawlResult(
+                url=url, success=False, duration=round(time.perf_counter() - started, 3), error=str(e)
+            )
+    
+    duration = round(time.perf_counter() - started, 3)
+    if not comments:
+        return [], [], 0, URLCrawlResult(url=url, success=False, duration=duration, error="Không tìm thấy bình luận")
+    return comments, predictions, reused, URLCrawlResult(url=url, success=True, comment_count=len(comments), duration=duration)
+
+async def _analyze_url(url: str, video_id: str) -> PredictionResponse:
+    """Crawl, predict, store and cache the analysis of one video"""
+    # Extract comments (only new ones when the video was crawled before) and predict
+    comments, predictions, reused = await _crawl_video(url, video_id)
+    if not comments:
+        raise HTTPException(status_code=404, detail="Không tìm thấy bình luận nào từ URL này")
+    
+    # Generate analysis
+    result = await _generate_analysis_result(comments, url, predictions)
+    if reused:
+        result.routing = {**(result.routing or {}), "stored": reused}
+    
+    # Store result
+    analysis_id = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random.randint(1000, 9999)}"
+    analysis_results[analysis_id] = result
+    result.analysis_id = analysis_id
+    
+    # Cache result
+    await _cache_analysis(video_id, result)
+    
+    logger.info(f"URL analysis completed: {len(comments)} comments processed")
+    return result
+
+async def _sample_url(url: str, video_id: str, margin: float) -> PredictionResponse:
+    """Crawl and score comments until the seeding percentage is known within ±margin"""
+    comments, predictions, estimate = await adaptive_sampler.run(tiktok_service.stream_comments(url), margin)
+    if not comments:
+        raise HTTPException(status_code=404, detail="Không tìm thấy bình luận nào từ URL này")
+    
+    result = await _generate_analysis_result(comments, url, predictions)
+    if estimate is not None:
+        result.estimate = SamplingEstimate(**estimate)
+    
+    analysis_id = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random.randint(1000, 9999)}"
+    analysis_results[analysis_id] = result
+    result.analysis_id = analysis_id
+    
+    if estimate is None:
+        # The crawl ran to the end: this is a full analysis
+        await _cache_analysis(video_id, result)
+    else:
+        await cache_service.set(_sample_cache_key(video_id, margin), result, ttl=settings.cache_ttl)
+    
+    logger.info(f"Sampled URL analysis completed: {len(comments)} comments processed")
+    return result
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     logger.info(f"Starting {settings.app_name} v{settings.app_version}")
     logger.info(f"Debug mode: {settings.debug}")
     logger.info(f"Rate limiting: {settings.rate_limit_requests} requests per {settings.rate_limit_window}s")
+    ml_service.start_workers()
+    inference_scheduler.start()
+    tiktok_service.start()
+    if settings.cache_snapshot_enabled:
+        cache_snapshot.start()
+    if settings.watch_list_enabled:
+        watch_list.start()
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down TikTok Seeding Detection API")
+    await watch_list.stop()
+    await inference_scheduler.stop()
     await ml_service.close()
     await tiktok_service.close()
+    if settings.cache_snapshot_enabled:
+        await cache_snapshot.save()
+    await cache_service.close()
 
 if __name__ == "__main__":
     import uvicorn
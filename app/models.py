@@ -17,6 +17,20 @@ class AnalysisStats(BaseModel):
     not_seeding: int
     seeding_percentage: float
 
+class URLCrawlResult(BaseModel):
+    url: str
+    success: bool
+    comment_count: int = 0
+    duration: float  # Thời gian crawl + xử lý (giây)
+    error: Optional[str] = None
+
+class SamplingEstimate(BaseModel):
+    margin: float  # Sai số yêu cầu (điểm phần trăm)
+    confidence_level: float
+    ci_lower: float  # Khoảng tin cậy của seeding_percentage
+    ci_upper: float
+    sample_size: int  # Số bình luận đã chấm trước khi dừng
+
 class PredictionResponse(BaseModel):
     comments: List[Comment]
     stats: AnalysisStats
@@ -24,13 +38,22 @@ class PredictionResponse(BaseModel):
     source: str
     processed_at: str
     analysis_id: Optional[str] = None
+    routing: Optional[Dict[str, int]] = None  # Số bình luận theo stage: cache/heuristic/model/fallback/simulation
+    url_results: Optional[List[URLCrawlResult]] = None  # Kết quả từng URL (chỉ với /predict/urls)
+    estimate: Optional[SamplingEstimate] = None  # Có giá trị khi stats là ước lượng từ chế độ lấy mẫu
 
 class URLRequest(BaseModel):
     url: str = Field(..., description="TikTok video URL")
+    sample: bool = Field(False, description="Estimate the seeding percentage from a sample of comments")
+    margin: Optional[float] = Field(None, gt=0, le=50, description="Sampling margin of error in percentage points")
 
 class MultiURLRequest(BaseModel):
     urls: List[str] = Field(..., description="List of TikTok video URLs")
 
+class WatchRequest(BaseModel):
+    url: str = Field(..., description="TikTok video URL to refresh periodically")
+    interval: Optional[int] = Field(None, description="Refresh interval in seconds")
+
 class PredictionRequest(BaseModel):
     text: str = Field(..., description="Comment text to analyze")
 
@@ -41,6 +64,7 @@ class MLPrediction(BaseModel):
     label: int  # 0 or 1
     confidence: float
     processing_time: float
+    stage: Optional[str] = None  # cache, heuristic, model, fallback or simulation
 
 class TikTokVideoInfo(BaseModel):
     video_id: str
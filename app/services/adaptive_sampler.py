@@ -0,0 +1,124 @@
+import logging
+import math
+from statistics import NormalDist
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from ..models import Comment, MLPrediction
+from .data_processor import DataProcessor
+from .inference_scheduler import InferenceScheduler
+
+
+def wilson_interval(seeding: int, total: int, z: float) -> Tuple[float, float]:
+    """Wilson score interval of a proportion, as percentages"""
+    if total == 0:
+        return 0.0, 100.0
+    p = seeding / total
+    denominator = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return max(0.0, center - half_width) * 100, min(1.0, center + half_width) * 100
+
+
+class AdaptiveSampler:
+    """Estimates a video's seeding percentage from a prefix of its comments.
+
+    Comments are crawled and scored in batches of ``batch_size``; after at
+    least ``min_comments`` the Wilson interval of the seeding percentage is
+    checked and the crawl stops once its half-width is within the requested
+    margin. Comments arrive in TikTok's order, not uniformly at random, so
+    the interval is an estimate of the crawled population only.
+    """
+
+    def __init__(
+        self,
+        data_processor: DataProcessor,
+        inference_scheduler: InferenceScheduler,
+        batch_size: int = 50,
+        min_comments: int = 100,
+        confidence_level: float = 0.95
+    ):
+        self.data_processor = data_processor
+        self.inference_scheduler = inference_scheduler
+        self.batch_size = max(1, batch_size)
+        self.min_comments = max(1, min_comments)
+        self.confidence_level = confidence_level
+        self.z = NormalDist().inv_cdf((1 + confidence_level) / 2)
+        self.logger = logging.getLogger(__name__)
+
+        self.stats = {
+            'runs': 0,
+            'stopped_early': 0,
+            'comments_scored': 0
+        }
+
+    async def _score(self, items: List[Dict[str, Any]]) -> Tuple[List[Comment], List[MLPrediction]]:
+        comments = await self.data_processor.process_comments(items)
+        if not comments:
+            return [], []
+        predictions = await self.inference_scheduler.predict([c.comment_text for c in comments])
+        for comment, prediction in zip(comments, predictions):
+            comment.prediction = prediction.label
+            comment.confidence = prediction.confidence
+        return comments, predictions
+
+    async def run(
+        self,
+        source: AsyncIterator[Dict[str, Any]],
+        margin: float
+    ) -> Tuple[List[Comment], List[MLPrediction], Optional[Dict[str, Any]]]:
+        """Crawl and score until the interval is within ±margin percentage points.
+
+        Returns (comments, predictions, estimate); estimate is None when the
+        crawl ran to the end before the interval was narrow enough, i.e. the
+        result covers every crawlable comment.
+        """
+        self.stats['runs'] += 1
+        comments: List[Comment] = []
+        predictions: List[MLPrediction] = []
+        seeding = 0
+        pending: List[Dict[str, Any]] = []
+        estimate: Optional[Dict[str, Any]] = None
+
+        try:
+            async for item in source:
+                pending.append(item)
+                if len(pending) < self.batch_size:
+                    continue
+                batch_comments, batch_predictions = await self._score(pending)
+                pending = []
+                comments.extend(batch_comments)
+                predictions.extend(batch_predictions)
+                seeding += sum(1 for p in batch_predictions if p.label == 1)
+
+                if len(comments) < self.min_comments:
+                    continue
+                lower, upper = wilson_interval(seeding, len(comments), self.z)
+                if (upper - lower) / 2 <= margin:
+                    estimate = {
+                        'margin': margin,
+                        'confidence_level': self.confidence_level,
+                        'ci_lower': round(lower, 2),
+                        'ci_upper': round(upper, 2),
+                        'sample_size': len(comments)
+                    }
+                    break
+        finally:
+            # Stops the crawl (and releases its TikTok session) when we break early
+            await source.aclose()
+
+        if estimate is None and pending:
+            batch_comments, batch_predictions = await self._score(pending)
+            comments.extend(batch_comments)
+            predictions.extend(batch_predictions)
+
+        if estimate is not None:
+            self.stats['stopped_early'] += 1
+            self.logger.info(
+                f"Sampling stopped after {len(comments)} comments: "
+                f"seeding in [{estimate['ci_lower']}, {estimate['ci_upper']}]%"
+            )
+        self.stats['comments_scored'] += len(comments)
+        return comments, predictions, estimate
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'confidence_level': self.confidence_level, **self.stats}
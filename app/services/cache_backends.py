@@ -0,0 +1,390 @@
+import asyncio
+import heapq
+import logging
+import os
+import pickle
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Approximate memory footprint of a value in bytes (computed once per entry)"""
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return sys.getsizeof(value)
+    if _depth > 8:
+        return sys.getsizeof(value)
+    if isinstance(value, BaseModel):
+        return sys.getsizeof(value) + estimate_size(value.__dict__, _depth + 1)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(item, _depth + 1) for item in value)
+    return sys.getsizeof(value)
+
+
+class CacheBackend:
+    """Storage behind CacheService.
+
+    ``get`` returns None for missing or expired keys; ``ttl`` is in seconds.
+    Hit/miss accounting is done by CacheService, backends only report their
+    own size and eviction counters.
+    """
+
+    name = "base"
+    persistent = False  # Entries survive a process restart on their own
+    # Called with the key of every entry a non-persistent backend drops (evicted, expired, replaced, deleted)
+    on_remove: Optional[Callable[[str], None]] = None
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+    async def cleanup_expired(self) -> int:
+        return 0
+
+    def export_entries(self) -> List[Tuple[str, Any, float]]:
+        """(key, value, remaining ttl) of every live entry, for snapshots of non-persistent backends"""
+        return []
+
+    async def close(self) -> None:
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    expires_at: float  # time.monotonic()
+    size: int
+    created_at: datetime = field(default_factory=datetime.now)
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process LRU cache bounded by entry count and approximate bytes.
+
+    Expiry times are kept in a min-heap so expired entries are dropped on
+    writes and stats calls without scanning the cache.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_size: int = 1000, max_bytes: int = 256 * 1024 * 1024):
+        self.max_size = max(1, max_size)
+        self.max_bytes = max(1, max_bytes)
+        self.cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        # (expires_at, key); entries replaced or deleted since are skipped when popped
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._bytes = 0
+        self.stats = {
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    def _remove(self, key: str) -> _CacheEntry:
+        entry = self.cache.pop(key)
+        self._bytes -= entry.size
+        if self.on_remove is not None:
+            self.on_remove(key)
+        return entry
+
+    def _expire(self, now: float) -> int:
+        """Drop every entry whose expiry time has passed"""
+        expired = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry_heap)
+            entry = self.cache.get(key)
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(key)
+                expired += 1
+        self.stats['expirations'] += expired
+        # Rebuild when replaced entries left too many stale heap items behind
+        if len(self._expiry_heap) > 2 * len(self.cache) + 64:
+            self._expiry_heap = [(entry.expires_at, key) for key, entry in self.cache.items()]
+            heapq.heapify(self._expiry_heap)
+        return expired
+
+    def _evict(self) -> None:
+        while self.cache and (len(self.cache) > self.max_size or self._bytes > self.max_bytes):
+            key = next(iter(self.cache))
+            self._remove(key)
+            self.stats['evictions'] += 1
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry.expires_at:
+            # Remove expired entry; its heap item is skipped later
+            self._remove(key)
+            self.stats['expirations'] += 1
+            return None
+        self.cache.move_to_end(key)
+        return entry.value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        now = time.monotonic()
+        self._expire(now)
+        if key in self.cache:
+            self._remove(key)
+        entry = _CacheEntry(value=value, expires_at=now + ttl, size=estimate_size(value))
+        self.cache[key] = entry
+        self._bytes += entry.size
+        heapq.heappush(self._expiry_heap, (entry.expires_at, key))
+        self._evict()
+
+    async def delete(self, key: str) -> bool:
+        if key in self.cache:
+            self._remove(key)
+            return True
+        return False
+
+    async def clear(self) -> None:
+        self.cache.clear()
+        self._expiry_heap.clear()
+        self._bytes = 0
+
+    async def cleanup_expired(self) -> int:
+        return self._expire(time.monotonic())
+
+    def export_entries(self) -> List[Tuple[str, Any, float]]:
+        now = time.monotonic()
+        # Least recently used first, so restoring them in order keeps the LRU order
+        return [
+            (key, entry.value, entry.expires_at - now)
+            for key, entry in self.cache.items()
+            if entry.expires_at > now
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        self._expire(time.monotonic())
+        return {
+            'total_entries': len(self.cache),
+            'active_entries': len(self.cache),
+            'max_size': self.max_size,
+            'memory_usage_mb': round(self._bytes / (1024 * 1024), 3),
+            'max_memory_mb': round(self.max_bytes / (1024 * 1024), 3),
+            **self.stats
+        }
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Cache shared by every worker process on a host, stored in SQLite (WAL mode).
+
+    Values are pickled. Expiry uses wall-clock time so all processes agree;
+    beyond ``max_size`` entries the least recently read ones are deleted.
+    All queries run on one dedicated thread that owns the connection.
+    """
+
+    name = "sqlite"
+    persistent = True
+
+    def __init__(self, path: str, max_size: int = 1000, cleanup_every: int = 100):
+        self.path = path
+        self.max_size = max(1, max_size)
+        self.cleanup_every = max(1, cleanup_every)
+        self.logger = logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        # Refreshed on every write so get_stats does not have to query
+        self._entries = 0
+        self._file_bytes = 0
+        self.stats = {
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries (expires_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute("DELETE FROM cache_entries WHERE key = ? AND expires_at <= ?", (key, now))
+            self.stats['expirations'] += 1
+            return None
+        conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def _delete_expired(self, conn: sqlite3.Connection) -> int:
+        expired = conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),)).rowcount
+        self.stats['expirations'] += expired
+        return expired
+
+    def _refresh_counts(self, conn: sqlite3.Connection) -> None:
+        self._entries = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        self._file_bytes = page_count * page_size
+
+    def _set(self, key: str, data: bytes, ttl: float) -> None:
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, sqlite3.Binary(data), now + ttl, now)
+        )
+        self._writes += 1
+        if self._writes % self.cleanup_every == 0:
+            self._delete_expired(conn)
+        self._refresh_counts(conn)
+        overflow = self._entries - self.max_size
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE key IN "
+                "(SELECT key FROM cache_entries ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,)
+            )
+            self.stats['evictions'] += overflow
+            self._entries -= overflow
+
+    def _delete(self, key: str) -> bool:
+        deleted = self._connect().execute("DELETE FROM cache_entries WHERE key = ?", (key,)).rowcount > 0
+        if deleted:
+            self._entries = max(0, self._entries - 1)
+        return deleted
+
+    def _clear(self) -> None:
+        self._connect().execute("DELETE FROM cache_entries")
+        self._entries = 0
+
+    def _cleanup(self) -> int:
+        conn = self._connect()
+        expired = self._delete_expired(conn)
+        self._refresh_counts(conn)
+        return expired
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def get(self, key: str) -> Optional[Any]:
+        data = await self._run(self._get, key)
+        if data is None:
+            return None
+        try:
+            return pickle.loads(data)
+        except Exception as e:
+            self.logger.warning(f"Dropping undecodable cache entry {key}: {e}")
+            await self.delete(key)
+            return None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self._run(self._set, key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+
+    async def delete(self, key: str) -> bool:
+        return await self._run(self._delete, key)
+
+    async def clear(self) -> None:
+        await self._run(self._clear)
+
+    async def cleanup_expired(self) -> int:
+        return await self._run(self._cleanup)
+
+    async def close(self) -> None:
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'total_entries': self._entries,
+            'active_entries': self._entries,
+            'max_size': self.max_size,
+            'file_size_mb': round(self._file_bytes / (1024 * 1024), 3),
+            **self.stats
+        }
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache shared through a Redis-protocol server (Redis, KeyDB, Dragonfly, ...).
+
+    Values are pickled and expire through the server's own TTLs; size limits
+    are left to the server's ``maxmemory`` policy. Needs the optional
+    ``redis`` package.
+    """
+
+    name = "redis"
+    persistent = True
+
+    def __init__(self, url: str, prefix: str = "seeding-cache:"):
+        import redis.asyncio as redis_asyncio  # Optional dependency
+        self.url = url
+        self.prefix = prefix
+        self.logger = logging.getLogger(__name__)
+        self._client = redis_asyncio.from_url(url)
+
+    async def get(self, key: str) -> Optional[Any]:
+        data = await self._client.get(self.prefix + key)
+        if data is None:
+            return None
+        try:
+            return pickle.loads(data)
+        except Exception as e:
+            self.logger.warning(f"Dropping undecodable cache entry {key}: {e}")
+            await self.delete(key)
+            return None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self._client.set(
+            self.prefix + key,
+            pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+            px=max(1, int(ttl * 1000))
+        )
+
+    async def delete(self, key: str) -> bool:
+        return await self._client.delete(self.prefix + key) > 0
+
+    async def clear(self) -> None:
+        keys = [key async for key in self._client.scan_iter(match=self.prefix + "*")]
+        if keys:
+            await self._client.delete(*keys)
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        # Entry counts would need a server round trip; see the server's INFO instead
+        return {'prefix': self.prefix, 'total_entries': None, 'active_entries': None}
@@ -0,0 +1,109 @@
+import gzip
+import json
+import logging
+import sys
+from typing import Any, Optional, Type
+
+from pydantic import BaseModel
+
+try:
+    import orjson  # Optional: faster JSON for plain dict/list values
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class CachedPayload:
+    """A cache entry kept as compressed JSON bytes.
+
+    ``data`` is the JSON document compressed with ``encoding``; ``model`` is
+    the pydantic class to rebuild on ``decode`` (None for plain JSON values).
+    Nothing is decoded until a caller asks for it.
+    """
+
+    __slots__ = ('data', 'encoding', 'model')
+
+    def __init__(self, data: bytes, encoding: str, model: Optional[Type[BaseModel]] = None):
+        self.data = data
+        self.encoding = encoding
+        self.model = model
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sys.getsizeof(self.data)
+
+    def __getstate__(self):
+        return self.data, self.encoding, self.model
+
+    def __setstate__(self, state):
+        self.data, self.encoding, self.model = state
+
+    def json_bytes(self) -> bytes:
+        """The uncompressed JSON document"""
+        return _decompress(self.data, self.encoding)
+
+    def decode(self) -> Any:
+        raw = self.json_bytes()
+        if self.model is not None:
+            return self.model.model_validate_json(raw)
+        return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    if encoding == "lz4":
+        import lz4.frame
+        return lz4.frame.decompress(data)
+    return data
+
+
+class CacheCodec:
+    """Encodes cache values into CachedPayload.
+
+    Pydantic models are serialized by pydantic-core's JSON serializer, other
+    values by orjson when it is installed. ``gzip`` output can be sent to
+    clients as-is with ``Content-Encoding: gzip``; ``zstd`` and ``lz4`` need
+    the optional zstandard / lz4 packages and fall back to gzip without them.
+    """
+
+    def __init__(self, compression: str = "gzip", level: int = 6):
+        self.level = level
+        self.compression = self._available(compression)
+
+    @staticmethod
+    def _available(compression: str) -> str:
+        try:
+            if compression == "zstd":
+                import zstandard  # noqa: F401
+            elif compression == "lz4":
+                import lz4.frame  # noqa: F401
+            elif compression not in ("gzip", "none"):
+                raise ValueError(f"Unknown cache compression: {compression}")
+        except ImportError:
+            logger.warning(f"Cache compression '{compression}' is not installed; using gzip")
+            return "gzip"
+        return compression
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == "gzip":
+            return gzip.compress(data, compresslevel=self.level, mtime=0)
+        if self.compression == "zstd":
+            import zstandard
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        if self.compression == "lz4":
+            import lz4.frame
+            return lz4.frame.compress(data)
+        return data
+
+    def encode(self, value: Any) -> CachedPayload:
+        if isinstance(value, BaseModel):
+            raw = value.model_dump_json().encode('utf-8')
+            model = type(value)
+        else:
+            raw = orjson.dumps(value) if orjson is not None else json.dumps(value, ensure_ascii=False, default=str).encode('utf-8')
+            model = None
+        return CachedPayload(self._compress(raw), self.compression, model)
@@ -1,83 +1,199 @@
 import asyncio
 import json
-from datetime import datetime, timedelta
-from typing import Any, Optional, Dict
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional, Dict, List, NamedTuple, Tuple
 import hashlib
 
+from ..config import Settings, get_settings
+from .cache_backends import CacheBackend, MemoryCacheBackend, RedisCacheBackend, SQLiteCacheBackend
+from .cache_codec import CacheCodec, CachedPayload
+
+logger = logging.getLogger(__name__)
+
+
+class _Staleable(NamedTuple):
+    """Stored value with a soft expiry; the backend TTL is the hard one"""
+    value: Any
+    fresh_until: float  # time.time(), so every worker process agrees
+
+
 class CacheService:
-    """Simple in-memory cache service for API responses"""
-    
-    def __init__(self):
-        self.cache: Dict[str, Dict[str, Any]] = {}
-        self.default_ttl = 3600  # 1 hour in seconds
-    
+    """Cache for API responses on top of a pluggable backend.
+
+    The default backend is a per-process bounded LRU; with several uvicorn
+    workers the SQLite (WAL) or Redis backend shares entries between them.
+    With a ``codec`` values are stored as compressed JSON (CachedPayload)
+    and only decoded by ``get``; ``get_payload`` hands out the stored bytes.
+
+    Entries set with ``stale_ttl`` stay readable for that long after their
+    (soft) ``ttl``; ``lookup`` reports them as stale so the caller can serve
+    them and start one background refresh with ``revalidate``. Hit/miss
+    counters are per process.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend] = None,
+        default_ttl: int = 3600,
+        codec: Optional[CacheCodec] = None
+    ):
+        self.backend = backend or MemoryCacheBackend()
+        self.default_ttl = default_ttl
+        self.codec = codec
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        # Keys restored from a snapshot and still stored -> served at least once since
+        self._warm_keys: Dict[str, bool] = {}
+        self.backend.on_remove = self._forget_warm_key
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale_hits': 0,
+            'refreshes': 0,
+            'refresh_failures': 0,
+            'restored': 0,
+            'warm_hits': 0,
+            'warm_entries_used': 0  # Restored entries served at least once
+        }
+
     def _generate_key(self, prefix: str, data: Any) -> str:
         """Generate a cache key from data"""
         data_str = json.dumps(data, sort_keys=True)
         hash_obj = hashlib.md5(data_str.encode())
         return f"{prefix}:{hash_obj.hexdigest()}"
-    
+
     async def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
-        if key in self.cache:
-            entry = self.cache[key]
-            if datetime.now() < entry['expires_at']:
-                return entry['value']
-            else:
-                # Remove expired entry
-                del self.cache[key]
-        return None
-    
-    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        """Set value in cache with TTL"""
+        value = await self.get_payload(key)
+        if isinstance(value, CachedPayload):
+            return value.decode()
+        return value
+
+    async def get_payload(self, key: str) -> Optional[Any]:
+        """Get the stored entry without decoding it (a CachedPayload for compact entries)"""
+        value, _ = await self.lookup(key)
+        return value
+
+    async def lookup(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Get the stored entry without decoding it and whether it is past its soft TTL"""
+        value = await self.backend.get(key)
+        if value is None:
+            self.stats['misses'] += 1
+            return None, False
+        self.stats['hits'] += 1
+        if key in self._warm_keys:
+            self.stats['warm_hits'] += 1
+            if not self._warm_keys[key]:
+                self._warm_keys[key] = True
+                self.stats['warm_entries_used'] += 1
+        stale = False
+        if isinstance(value, _Staleable):
+            stale = time.time() >= value.fresh_until
+            value = value.value
+        if stale:
+            self.stats['stale_hits'] += 1
+        return value, stale
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None, stale_ttl: int = 0) -> None:
+        """Set value in cache with TTL; with stale_ttl it can be served stale for that much longer"""
         if ttl is None:
             ttl = self.default_ttl
-        
-        expires_at = datetime.now() + timedelta(seconds=ttl)
-        self.cache[key] = {
-            'value': value,
-            'expires_at': expires_at,
-            'created_at': datetime.now()
-        }
-    
+        if self.codec is not None:
+            value = self.codec.encode(value)
+        if stale_ttl > 0:
+            value = _Staleable(value, time.time() + ttl)
+            ttl += stale_ttl
+        self._warm_keys.pop(key, None)
+        await self.backend.set(key, value, ttl)
+
+    def export_entries(self) -> List[Tuple[str, Any, float]]:
+        """Stored entries with their remaining TTL; empty for backends that persist on their own"""
+        return self.backend.export_entries()
+
+    def _forget_warm_key(self, key: str) -> None:
+        self._warm_keys.pop(key, None)
+
+    async def restore_entry(self, key: str, value: Any, ttl: float) -> bool:
+        """Put back an exported entry unless the key was set again meanwhile"""
+        if ttl <= 0 or await self.backend.get(key) is not None:
+            return False
+        await self.backend.set(key, value, ttl)
+        self._warm_keys[key] = False
+        self.stats['restored'] += 1
+        return True
+
+    def revalidate(self, key: str, refresh: Callable[[], Awaitable[Any]]) -> bool:
+        """Run refresh in the background unless one is already running for this key"""
+        if key in self._refreshing:
+            return False
+        task = asyncio.create_task(self._revalidate(key, refresh))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _, key=key: self._refreshing.pop(key, None))
+        return True
+
+    async def _revalidate(self, key: str, refresh: Callable[[], Awaitable[Any]]) -> None:
+        self.stats['refreshes'] += 1
+        try:
+            await refresh()
+        except Exception as e:
+            self.stats['refresh_failures'] += 1
+            logger.warning(f"Background refresh of cache entry {key} failed: {e}")
+
     async def delete(self, key: str) -> bool:
         """Delete key from cache"""
-        if key in self.cache:
-            del self.cache[key]
-            return True
-        return False
-    
+        return await self.backend.delete(key)
+
     async def clear(self) -> None:
         """Clear all cache entries"""
-        self.cache.clear()
-    
+        await self.backend.clear()
+        self._warm_keys.clear()
+
     async def cleanup_expired(self) -> int:
         """Remove expired entries and return count"""
-        now = datetime.now()
-        expired_keys = [
-            key for key, entry in self.cache.items()
-            if now >= entry['expires_at']
-        ]
-        
-        for key in expired_keys:
-            del self.cache[key]
-        
-        return len(expired_keys)
-    
+        return await self.backend.cleanup_expired()
+
+    async def close(self) -> None:
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        await asyncio.gather(*self._refreshing.values(), return_exceptions=True)
+        await self.backend.close()
+
+    @property
+    def persistent(self) -> bool:
+        return self.backend.persistent
+
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        now = datetime.now()
-        active_entries = sum(
-            1 for entry in self.cache.values()
-            if now < entry['expires_at']
-        )
-        
+        lookups = self.stats['hits'] + self.stats['misses']
         return {
-            'total_entries': len(self.cache),
-            'active_entries': active_entries,
-            'expired_entries': len(self.cache) - active_entries,
-            'memory_usage_mb': len(str(self.cache)) / (1024 * 1024)
+            'backend': self.backend.name,
+            'compression': self.codec.compression if self.codec else None,
+            **self.backend.get_stats(),
+            **self.stats,
+            'refreshing': len(self._refreshing),
+            'warm_hit_rate': round(self.stats['warm_entries_used'] / self.stats['restored'], 4) if self.stats['restored'] else 0.0,
+            'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0.0
         }
 
+
+def create_cache_backend(settings: Settings) -> CacheBackend:
+    """Backend selected by CACHE_BACKEND ("memory", "sqlite" or "redis")"""
+    if settings.cache_backend == "sqlite":
+        return SQLiteCacheBackend(settings.cache_sqlite_path, max_size=settings.cache_max_size)
+    if settings.cache_backend == "redis":
+        try:
+            return RedisCacheBackend(settings.cache_redis_url)
+        except ImportError:
+            logger.warning("CACHE_BACKEND=redis needs the 'redis' package; falling back to the memory cache")
+    return MemoryCacheBackend(
+        max_size=settings.cache_max_size,
+        max_bytes=settings.cache_max_memory_mb * 1024 * 1024
+    )
+
 # Global cache instance
-cache_service = CacheService()
\ No newline at end of file
+_settings = get_settings()
+cache_service = CacheService(
+    create_cache_backend(_settings),
+    default_ttl=_settings.cache_ttl,
+    codec=CacheCodec(_settings.cache_compression, _settings.cache_compression_level) if _settings.cache_compact_entries else None
+)
@@ -0,0 +1,111 @@
+import asyncio
+import gzip
+import logging
+import os
+import pickle
+import time
+from typing import Any, Dict, Optional
+
+from .cache_service import CacheService
+
+
+class CacheSnapshot:
+    """Saves the response cache and stored analyses across restarts.
+
+    On shutdown the live cache entries (with their remaining TTL) and the
+    ``analysis_results`` dict are pickled into one gzip file. On startup the
+    file is loaded in the background; requests arriving before it is done
+    just miss the cache. Entries that expired while the service was down are
+    skipped, and keys set again meanwhile are not overwritten. Backends that
+    persist on their own (SQLite, Redis) only have their analyses saved.
+    """
+
+    def __init__(self, path: str, cache: CacheService, analysis_results: Dict[str, Any]):
+        self.path = path
+        self.cache = cache
+        self.analysis_results = analysis_results
+        self.logger = logging.getLogger(__name__)
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            'saved_entries': 0,
+            'saved_analyses': 0,
+            'loaded_entries': 0,
+            'loaded_analyses': 0,
+            'skipped_entries': 0,  # Expired while down or set again meanwhile
+            'load_seconds': None
+        }
+
+    def _write(self, snapshot: Dict[str, Any]) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Per process: several uvicorn workers may save at the same shutdown
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return None
+        with gzip.open(self.path, 'rb') as f:
+            return pickle.load(f)
+
+    async def save(self) -> None:
+        """Write the snapshot (called from the shutdown hook)"""
+        if self._task is not None and not self._task.done():
+            # Do not overwrite the snapshot with a half-restored cache
+            await asyncio.gather(self._task, return_exceptions=True)
+        entries = [] if self.cache.persistent else self.cache.export_entries()
+        snapshot = {
+            'saved_at': time.time(),
+            'entries': entries,
+            'analysis_results': dict(self.analysis_results)
+        }
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._write, snapshot)
+        except Exception as e:
+            self.logger.warning(f"Could not write cache snapshot to {self.path}: {e}")
+            return
+        self.stats['saved_entries'] = len(entries)
+        self.stats['saved_analyses'] = len(snapshot['analysis_results'])
+        self.logger.info(f"Saved cache snapshot: {len(entries)} entries, {self.stats['saved_analyses']} analyses")
+
+    def start(self) -> None:
+        """Load the snapshot in the background without delaying startup"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._load())
+
+    async def _load(self) -> None:
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            snapshot = await loop.run_in_executor(None, self._read)
+        except Exception as e:
+            self.logger.warning(f"Could not read cache snapshot {self.path}: {e}")
+            return
+        if snapshot is None:
+            return
+
+        downtime = max(0.0, time.time() - snapshot.get('saved_at', time.time()))
+        for key, value, ttl in snapshot.get('entries', []):
+            if await self.cache.restore_entry(key, value, ttl - downtime):
+                self.stats['loaded_entries'] += 1
+            else:
+                self.stats['skipped_entries'] += 1
+        for analysis_id, result in snapshot.get('analysis_results', {}).items():
+            if analysis_id not in self.analysis_results:
+                self.analysis_results[analysis_id] = result
+                self.stats['loaded_analyses'] += 1
+
+        self.stats['load_seconds'] = round(time.perf_counter() - started, 3)
+        self.logger.info(
+            f"Restored cache snapshot: {self.stats['loaded_entries']} entries, "
+            f"{self.stats['loaded_analyses']} analyses (down for {downtime:.0f}s)"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'loading': self._task is not None and not self._task.done(),
+            **self.stats
+        }
@@ -0,0 +1,102 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+_TIME_FORMAT = "%Y%m%dT%H%M%S"
+_SUFFIX = ".jsonl.gz"
+
+
+class CommentArchive:
+    """On-disk archive of raw crawled comments.
+
+    Every crawl of a video is written as one gzip-compressed JSONL file
+    ``<directory>/<video_id>/<crawl time>.jsonl.gz``. Re-scoring reads the
+    newest file instead of crawling TikTok again while it is fresh enough;
+    only the newest ``keep_per_video`` crawls of a video are kept.
+    """
+
+    def __init__(self, directory: str, max_age: int = 21600, keep_per_video: int = 3):
+        self.directory = directory
+        self.max_age = max_age
+        self.keep_per_video = max(1, keep_per_video)
+        self.logger = logging.getLogger(__name__)
+        self.stats = {
+            'writes': 0,
+            'fresh_hits': 0,
+            'stale_or_missing': 0
+        }
+
+    def _video_dir(self, video_id: str) -> str:
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9_.-]', '_', video_id))
+
+    def _crawls(self, video_id: str) -> List[Tuple[datetime, str]]:
+        """Archived crawls of a video, newest first"""
+        video_dir = self._video_dir(video_id)
+        if not os.path.isdir(video_dir):
+            return []
+        crawls = []
+        for name in os.listdir(video_dir):
+            if not name.endswith(_SUFFIX):
+                continue
+            try:
+                crawled_at = datetime.strptime(name[:-len(_SUFFIX)], _TIME_FORMAT)
+            except ValueError:
+                continue
+            crawls.append((crawled_at, os.path.join(video_dir, name)))
+        return sorted(crawls, reverse=True)
+
+    def _write(self, video_id: str, comments: List[Dict[str, Any]], crawled_at: datetime) -> str:
+        video_dir = self._video_dir(video_id)
+        os.makedirs(video_dir, exist_ok=True)
+        path = os.path.join(video_dir, crawled_at.strftime(_TIME_FORMAT) + _SUFFIX)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            for comment in comments:
+                f.write(json.dumps(comment, ensure_ascii=False))
+                f.write('\n')
+        os.replace(tmp_path, path)
+
+        for _, old_path in self._crawls(video_id)[self.keep_per_video:]:
+            os.remove(old_path)
+        return path
+
+    @staticmethod
+    def _read(path: str) -> List[Dict[str, Any]]:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    async def write(self, video_id: str, comments: List[Dict[str, Any]], crawled_at: Optional[datetime] = None) -> None:
+        """Archive the full raw comment list of one crawl"""
+        crawled_at = crawled_at or datetime.now()
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._write, video_id, comments, crawled_at)
+            self.stats['writes'] += 1
+        except Exception as e:
+            self.logger.warning(f"Could not archive comments of {video_id}: {e}")
+
+    async def latest(self, video_id: str, max_age: Optional[int] = None) -> Optional[Tuple[datetime, List[Dict[str, Any]]]]:
+        """Newest archived crawl of a video if it is younger than max_age seconds"""
+        max_age = self.max_age if max_age is None else max_age
+        loop = asyncio.get_running_loop()
+        crawls = await loop.run_in_executor(None, self._crawls, video_id)
+        if not crawls or datetime.now() - crawls[0][0] > timedelta(seconds=max_age):
+            self.stats['stale_or_missing'] += 1
+            return None
+
+        crawled_at, path = crawls[0]
+        try:
+            comments = await loop.run_in_executor(None, self._read, path)
+        except Exception as e:
+            self.logger.warning(f"Could not read comment archive {path}: {e}")
+            return None
+        self.stats['fresh_hits'] += 1
+        return crawled_at, comments
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'directory': self.directory, 'max_age': self.max_age, **self.stats}
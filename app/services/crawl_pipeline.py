@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from ..models import Comment, MLPrediction
+from .data_processor import DataProcessor
+from .inference_scheduler import InferenceScheduler
+
+_DONE = object()
+
+
+class CrawlPipeline:
+    """Overlaps crawling with validation and batched prediction.
+
+    A producer task pushes crawled comment dicts into a bounded queue; the
+    consumer drains it into batches (``batch_size`` or ``max_wait_ms``),
+    validates them and submits each batch for prediction while the crawl
+    continues. At most ``max_in_flight`` batches are being predicted at once;
+    when inference falls behind the queue fills up and the crawler waits.
+    """
+
+    def __init__(
+        self,
+        data_processor: DataProcessor,
+        inference_scheduler: InferenceScheduler,
+        queue_size: int = 512,
+        batch_size: int = 64,
+        max_wait_ms: int = 200,
+        max_in_flight: int = 4
+    ):
+        self.data_processor = data_processor
+        self.inference_scheduler = inference_scheduler
+        self.queue_size = max(1, queue_size)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self.max_in_flight = max(1, max_in_flight)
+        self.logger = logging.getLogger(__name__)
+
+        self.stats = {
+            'runs': 0,
+            'comments': 0,
+            'batches': 0,
+            'crawl_errors': 0
+        }
+
+    async def _produce(self, source: AsyncIterator[Dict[str, Any]], queue: asyncio.Queue) -> None:
+        try:
+            async for item in source:
+                await queue.put(item)
+        except Exception as e:
+            # Keep what was crawled so far, like extract_comments does
+            self.stats['crawl_errors'] += 1
+            self.logger.warning(f"Crawl interrupted in pipeline: {e}")
+        # Not in a finally: a cancelled producer must not wait for room in a full queue
+        await queue.put(_DONE)
+
+    async def _next_batch(self, queue: asyncio.Queue) -> Tuple[List[Dict[str, Any]], bool]:
+        """Collect up to batch_size items; returns (items, crawl finished)"""
+        item = await queue.get()
+        if item is _DONE:
+            return [], True
+
+        items = [item]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(items) < self.batch_size:
+            remaining = deadline - loop.time()
+            try:
+                if remaining > 0:
+                    item = await asyncio.wait_for(queue.get(), remaining)
+                else:
+                    item = queue.get_nowait()
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            if item is _DONE:
+                return items, True
+            items.append(item)
+        return items, False
+
+    async def _predict(self, comments: List[Comment], in_flight: asyncio.Semaphore) -> List[MLPrediction]:
+        try:
+            return await self.inference_scheduler.predict([c.comment_text for c in comments])
+        finally:
+            in_flight.release()
+
+    async def run(self, source: AsyncIterator[Dict[str, Any]]) -> Tuple[List[Comment], List[MLPrediction]]:
+        """Crawl, validate and predict; returns comments and predictions in crawl order"""
+        self.stats['runs'] += 1
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        producer = asyncio.create_task(self._produce(source, queue))
+        batches: List[Tuple[List[Comment], asyncio.Task]] = []
+
+        try:
+            finished = False
+            while not finished:
+                items, finished = await self._next_batch(queue)
+                if not items:
+                    continue
+                comments = await self.data_processor.process_comments(items)
+                if not comments:
+                    continue
+                await in_flight.acquire()
+                batches.append((comments, asyncio.create_task(self._predict(comments, in_flight))))
+                self.stats['batches'] += 1
+            await producer
+            results = await asyncio.gather(*[task for _, task in batches])
+        except BaseException:
+            producer.cancel()
+            for _, task in batches:
+                task.cancel()
+            await asyncio.gather(producer, *[task for _, task in batches], return_exceptions=True)
+            # Stops the crawl (and releases its TikTok session) if the producer left it suspended
+            await source.aclose()
+            raise
+
+        all_comments: List[Comment] = []
+        all_predictions: List[MLPrediction] = []
+        for (comments, _), predictions in zip(batches, results):
+            all_comments.extend(comments)
+            all_predictions.extend(predictions)
+        self.stats['comments'] += len(all_comments)
+        return all_comments, all_predictions
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
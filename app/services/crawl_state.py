@@ -0,0 +1,141 @@
+import asyncio
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+
+@dataclass
+class VideoCrawlState:
+    """What we already know about one video's comments"""
+    video_key: str
+    url: str
+    newest_timestamp: float = 0.0  # Unix time of the newest comment seen
+    seen_ids: Set[str] = field(default_factory=set)
+    comments: List[Dict[str, Any]] = field(default_factory=list)  # Comments with prediction/confidence
+    model_tag: Optional[str] = None  # Model that produced the stored predictions
+    last_crawled_at: Optional[str] = None
+    crawl_count: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['seen_ids'] = sorted(self.seen_ids)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "VideoCrawlState":
+        data = dict(data)
+        data['seen_ids'] = set(data.get('seen_ids', []))
+        return cls(**data)
+
+
+class CrawlStateStore:
+    """Per-video crawl state persisted as one JSON file per video.
+
+    At most ``max_videos`` states are kept in memory (LRU); evicted ones are
+    read back from their file on the next ``load``. Locks of videos no one
+    is crawling are dropped along with them.
+    """
+
+    def __init__(self, directory: str, max_comments: int = 10000, max_videos: int = 256):
+        self.directory = directory
+        self.max_comments = max_comments
+        self.max_videos = max(1, max_videos)
+        self.logger = logging.getLogger(__name__)
+        self._states: "OrderedDict[str, VideoCrawlState]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.evictions = 0
+
+    def _path(self, video_key: str) -> str:
+        safe_key = re.sub(r'[^A-Za-z0-9_.-]', '_', video_key)
+        return os.path.join(self.directory, f"{safe_key}.json")
+
+    def lock(self, video_key: str) -> asyncio.Lock:
+        """Lock serializing crawl + merge + save for one video"""
+        if video_key not in self._locks:
+            if len(self._locks) >= self.max_videos:
+                self._prune_locks()
+            self._locks[video_key] = asyncio.Lock()
+        return self._locks[video_key]
+
+    def _prune_locks(self) -> None:
+        # A free lock has no waiters, so a later lock() can safely hand out a new one
+        for key in [key for key, lock in self._locks.items() if not lock.locked()]:
+            del self._locks[key]
+
+    def _remember(self, state: VideoCrawlState) -> None:
+        self._states[state.video_key] = state
+        self._states.move_to_end(state.video_key)
+        while len(self._states) > self.max_videos:
+            self._states.popitem(last=False)
+            self.evictions += 1
+
+    def _read(self, video_key: str) -> Optional[VideoCrawlState]:
+        path = self._path(video_key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return VideoCrawlState.from_dict(json.load(f))
+
+    def _write(self, state: VideoCrawlState) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(state.video_key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    async def load(self, video_key: str) -> Optional[VideoCrawlState]:
+        if video_key in self._states:
+            self._states.move_to_end(video_key)
+            return self._states[video_key]
+        loop = asyncio.get_running_loop()
+        try:
+            state = await loop.run_in_executor(None, self._read, video_key)
+        except Exception as e:
+            self.logger.warning(f"Could not read crawl state for {video_key}: {e}")
+            return None
+        if state is not None:
+            self._remember(state)
+        return state
+
+    async def save(self, state: VideoCrawlState) -> None:
+        # Keep only the newest comments so the state cannot grow without bound
+        if len(state.comments) > self.max_comments:
+            state.comments.sort(key=lambda c: c.get('timestamp', ''), reverse=True)
+            del state.comments[self.max_comments:]
+        # seen_ids follows the kept comments; a dropped (old) comment met again is
+        # scored again and then dropped again, which costs work but not space
+        if len(state.seen_ids) > len(state.comments):
+            state.seen_ids = {c['comment_id'] for c in state.comments if c.get('comment_id')}
+        state.last_crawled_at = datetime.now().isoformat()
+        state.crawl_count += 1
+        self._remember(state)
+
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._write, state)
+        except Exception as e:
+            self.logger.warning(f"Could not persist crawl state for {state.video_key}: {e}")
+
+    async def delete(self, video_key: str) -> bool:
+        existed = self._states.pop(video_key, None) is not None
+        path = self._path(video_key)
+        if os.path.exists(path):
+            os.remove(path)
+            existed = True
+        return existed
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'videos_in_memory': len(self._states),
+            'max_videos': self.max_videos,
+            'evictions': self.evictions,
+            'locks': len(self._locks),
+            'comments_in_memory': sum(len(state.comments) for state in self._states.values()),
+            'directory': self.directory
+        }
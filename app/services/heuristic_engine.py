@@ -0,0 +1,192 @@
+import re
+from typing import List, Dict, Any, Sequence, Tuple
+
+import numpy as np
+
+# Separator between comments when a batch is scanned as one string; it never
+# appears inside a keyword, so a match can never span two comments
+_SEPARATOR = "\x00"
+# Ordered keyword pairs behave like the regex "first.*second", whose "." stops at newlines
+_LINE_BREAK = re.compile("[\n\x00]")
+
+
+def _build_keyword_automaton(terms: Sequence[str]) -> "re.Pattern":
+    """Compile keywords into one trie-shaped regex.
+
+    Every keyword ends in an empty named group ``t<index>``; the whole trie is
+    wrapped in a lookahead so a single ``finditer`` reports, at each position,
+    the longest keyword starting there (``lastgroup``). Overlapping keywords
+    are found because the lookahead consumes nothing.
+    """
+    trie: Dict[Any, Any] = {}
+    for index, term in enumerate(terms):
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[None] = index
+
+    def render(node: Dict[Any, Any]) -> str:
+        branches = [
+            re.escape(char) + render(child)
+            for char, child in node.items() if char is not None
+        ]
+        marker = f"(?P<t{node[None]}>)" if None in node else ""
+        if not branches:
+            return marker
+        alternation = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if marker:
+            # Terminal node: record the keyword, then greedily try longer ones
+            return marker + "(?:" + alternation + ")?"
+        return alternation
+
+    return re.compile("(?=" + render(trie) + ")")
+
+
+class HeuristicEngine:
+    """Deterministic keyword/pattern scorer for batches of comments.
+
+    All keywords (weighted keywords, seeding keywords, pattern parts and
+    contact channels) are compiled once into a single automaton. A batch is
+    lower-cased and joined into one string and scanned in one pass; matches
+    are mapped back to comments and scored with NumPy.
+    """
+
+    threshold = 3.0
+
+    def __init__(
+        self,
+        keyword_weights: Dict[str, float],
+        seeding_keywords: Sequence[str],
+        seeding_patterns: Sequence[Tuple[str, str]],
+        contact_keywords: Sequence[str] = ("zalo", "telegram", "facebook")
+    ):
+        terms: List[str] = []
+        term_index: Dict[str, int] = {}
+
+        def add(term: str) -> int:
+            if term not in term_index:
+                term_index[term] = len(terms)
+                terms.append(term)
+            return term_index[term]
+
+        self.weighted_columns = np.array([add(k) for k in keyword_weights], dtype=np.intp)
+        self.weights = np.array(list(keyword_weights.values()), dtype=np.float64)
+        self.seeding_columns = np.array([add(k) for k in seeding_keywords], dtype=np.intp)
+        self.contact_columns = np.array([add(k) for k in contact_keywords], dtype=np.intp)
+        self.pattern_columns = np.array(
+            [(add(first), add(second)) for first, second in seeding_patterns], dtype=np.intp
+        ).reshape(-1, 2)
+
+        self.terms = terms
+        self.term_lengths = np.array([len(term) for term in terms], dtype=np.int64)
+        self.automaton = _build_keyword_automaton(terms)
+        # The deepest keyword matched at a position implies every keyword
+        # that is a prefix of it matched there too
+        self.matched_terms = {
+            f"t{index}": [other for other, prefix in enumerate(terms) if term.startswith(prefix)]
+            for index, term in enumerate(terms)
+        }
+        self.phone_pattern = re.compile(r"\d{10,11}")
+
+    def _scan(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Scan a batch once and return match matrices.
+
+        ``hits`` is per comment; ``first_end`` / ``last_start`` are per line
+        (comments split at newlines) with ``line_rows`` mapping lines to
+        comments, so ordered pairs are only matched within one line.
+        """
+        n_texts, n_terms = len(texts), len(self.terms)
+        # Lower-case per comment so offsets stay aligned when lower() changes length
+        lowered = [text.lower() for text in texts]
+        joined = _SEPARATOR.join(lowered)
+        lengths = np.fromiter((len(text) for text in lowered), dtype=np.int64, count=n_texts)
+        offsets = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+
+        positions: List[int] = []
+        term_ids: List[int] = []
+        matched_terms = self.matched_terms
+        for match in self.automaton.finditer(joined):
+            position = match.start()
+            for term_id in matched_terms[match.lastgroup]:
+                positions.append(position)
+                term_ids.append(term_id)
+
+        breaks = np.fromiter(
+            (match.start() for match in _LINE_BREAK.finditer(joined)), dtype=np.int64
+        )
+        line_starts = np.concatenate(([0], breaks + 1))
+        line_rows = np.searchsorted(offsets, line_starts, side="right") - 1
+
+        hits = np.zeros((n_texts, n_terms), dtype=bool)
+        first_end = np.full((len(line_starts), n_terms), np.iinfo(np.int64).max, dtype=np.int64)
+        last_start = np.full((len(line_starts), n_terms), -1, dtype=np.int64)
+        if positions:
+            starts = np.array(positions, dtype=np.int64)
+            term_array = np.array(term_ids, dtype=np.intp)
+            rows = np.searchsorted(offsets, starts, side="right") - 1
+            lines = np.searchsorted(breaks, starts, side="right")
+            hits[rows, term_array] = True
+            np.minimum.at(first_end, (lines, term_array), starts + self.term_lengths[term_array])
+            np.maximum.at(last_start, (lines, term_array), starts)
+
+        phone = np.zeros(n_texts, dtype=bool)
+        phone_starts = [match.start() for match in self.phone_pattern.finditer(joined)]
+        if phone_starts:
+            phone[np.searchsorted(offsets, np.array(phone_starts, dtype=np.int64), side="right") - 1] = True
+
+        return {
+            "hits": hits,
+            "first_end": first_end,
+            "last_start": last_start,
+            "line_rows": line_rows,
+            "phone": phone
+        }
+
+    def score_batch(self, texts: List[str]) -> np.ndarray:
+        """Return the seeding score of every comment"""
+        if not texts:
+            return np.zeros(0, dtype=np.float64)
+
+        scan = self._scan(texts)
+        hits = scan["hits"]
+
+        scores = hits[:, self.weighted_columns].astype(np.float64) @ self.weights
+
+        # Ordered keyword pairs: first keyword ends before the second one starts, on the same line
+        if len(self.pattern_columns):
+            first, second = self.pattern_columns[:, 0], self.pattern_columns[:, 1]
+            line_hits = scan["first_end"][:, first] <= scan["last_start"][:, second]
+            pattern_hits = np.zeros((len(texts), len(first)), dtype=bool)
+            np.logical_or.at(pattern_hits, scan["line_rows"], line_hits)
+            scores += 2.0 * pattern_hits.sum(axis=1)
+
+        # Length and structure analysis
+        scores += 0.5 * np.fromiter((len(text.split()) > 15 for text in texts), dtype=bool, count=len(texts))
+        scores += 0.3 * np.fromiter(('!' in text or '?' in text for text in texts), dtype=bool, count=len(texts))
+
+        # Contact information
+        scores += 2.0 * scan["phone"]
+        if len(self.contact_columns):
+            scores += 1.5 * hits[:, self.contact_columns].any(axis=1)
+
+        return scores
+
+    def predict_batch(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Score and threshold a batch into (labels, confidences)"""
+        return self.threshold_scores(self.score_batch(texts))
+
+    def threshold_scores(self, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Threshold a batch of scores into (labels, confidences)"""
+        labels = (scores >= self.threshold).astype(np.int64)
+        confidences = np.where(
+            labels == 1,
+            np.minimum(0.65 + (scores - self.threshold) * 0.1, 0.95),
+            np.maximum(0.6, 0.9 - scores * 0.1)
+        )
+        return labels, np.clip(confidences, 0.5, 0.98)
+
+    def count_seeding_keywords(self, texts: List[str]) -> np.ndarray:
+        """Number of distinct seeding keywords present in each comment"""
+        if not texts:
+            return np.zeros(0, dtype=np.int64)
+        return self._scan(texts)["hits"][:, self.seeding_columns].sum(axis=1)
@@ -0,0 +1,376 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .heuristic_engine import HeuristicEngine
+from .local_inference import LocalInferenceEngine
+
+# Engines a job can ask a worker to run
+ENGINE_HEURISTIC = "heuristic"
+ENGINE_LOCAL = "local"
+
+_ALIGN = 8
+
+
+def _aligned(size: int) -> int:
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _batch_layout(count: int, text_bytes: int) -> Tuple[int, int, int, int, int]:
+    """Offsets of the blocks inside one shared-memory batch.
+
+    Layout: [offsets int64 x (count+1)] [utf-8 text bytes] [labels int64 x count]
+    [confidences float64 x count] [scores float64 x count]
+    """
+    text_start = _ALIGN * (count + 1)
+    labels_start = text_start + _aligned(text_bytes)
+    confidences_start = labels_start + _ALIGN * count
+    scores_start = confidences_start + _ALIGN * count
+    total = scores_start + _ALIGN * count
+    return text_start, labels_start, confidences_start, scores_start, total
+
+
+def _score_shared_batch(shm, engine_name, count, text_bytes, heuristic_engine, local_engine) -> None:
+    """Read one batch from shared memory, score it and write the results back"""
+    text_start, labels_start, confidences_start, scores_start, _ = _batch_layout(count, text_bytes)
+    offsets = np.ndarray((count + 1,), dtype=np.int64, buffer=shm.buf)
+    raw = bytes(shm.buf[text_start:text_start + text_bytes])
+    texts = [raw[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(count)]
+
+    labels = np.ndarray((count,), dtype=np.int64, buffer=shm.buf, offset=labels_start)
+    confidences = np.ndarray((count,), dtype=np.float64, buffer=shm.buf, offset=confidences_start)
+    scores = np.ndarray((count,), dtype=np.float64, buffer=shm.buf, offset=scores_start)
+
+    if engine_name == ENGINE_LOCAL:
+        if local_engine is None:
+            raise RuntimeError("Worker has no local model configured")
+        labels[:], confidences[:] = local_engine.predict_arrays(texts)
+        scores[:] = np.nan
+    else:
+        scores[:] = heuristic_engine.score_batch(texts)
+        labels[:], confidences[:] = heuristic_engine.threshold_scores(scores)
+
+
+def _worker_main(worker_id: int, config: Dict[str, Any], task_queue, result_conn) -> None:
+    """Worker process: owns its own engines and serves jobs until it gets None"""
+    heuristic_engine = HeuristicEngine(
+        config["keyword_weights"],
+        config["seeding_keywords"],
+        config["seeding_patterns"]
+    )
+    local_engine = None
+    if config.get("local_model"):
+        local_engine = LocalInferenceEngine(**config["local_model"])
+
+    while True:
+        job = task_queue.get()
+        if job is None:
+            break
+
+        job_id, engine_name, shm_name, count, text_bytes = job
+        started = time.perf_counter()
+        error = None
+        try:
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                _score_shared_batch(shm, engine_name, count, text_bytes, heuristic_engine, local_engine)
+            finally:
+                shm.close()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        result_conn.send((job_id, worker_id, error, time.perf_counter() - started, count))
+
+
+class InferenceWorkerPool:
+    """Pool of inference worker processes fed through shared memory.
+
+    Each worker process holds its own heuristic engine and (optionally) its own
+    copy of the local model, so CPU-bound scoring never runs on the event loop.
+    A batch is packed as UTF-8 bytes plus an offsets array into one
+    shared-memory segment; the worker writes labels, confidences and scores
+    back into the same segment. Only the segment name and sizes are pickled.
+
+    A worker found dead when a job is dispatched is restarted, and a worker
+    whose job times out is killed and replaced (it may be stuck); jobs still
+    queued on a replaced worker fail so their callers can fall back. Results
+    come back over one pipe per worker rather than a shared queue, whose
+    write lock a killed worker could leave held.
+    """
+
+    def __init__(self, num_workers: int, config: Dict[str, Any], job_timeout: float = 60.0):
+        self.num_workers = max(1, num_workers)
+        self.config = config
+        self.job_timeout = job_timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[Any] = []
+        self._task_queues: List[Any] = []
+        self._result_conns: List[Any] = []
+        self._reader_wakeup: Optional[Tuple[Any, Any]] = None  # (receive, send) ends
+        self._reader: Optional[threading.Thread] = None
+        self._futures: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._assigned: Dict[int, int] = {}  # job id -> worker id, until its result arrives
+        self._restart_tasks: Dict[int, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._started_at: Optional[float] = None
+
+        self._outstanding = [0] * self.num_workers
+        self._busy_seconds = [0.0] * self.num_workers
+        self._jobs = [0] * self.num_workers
+        self._items = [0] * self.num_workers
+        self._errors = [0] * self.num_workers
+        self._restarts = [0] * self.num_workers
+
+    @property
+    def is_running(self) -> bool:
+        return self._started_at is not None
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+
+        self._reader_wakeup = self._context.Pipe(duplex=False)
+        for worker_id in range(self.num_workers):
+            task_queue, process, result_conn = self._spawn(worker_id)
+            self._task_queues.append(task_queue)
+            self._processes.append(process)
+            self._result_conns.append(result_conn)
+
+        self._reader = threading.Thread(target=self._read_results, name="inference-pool-reader", daemon=True)
+        self._reader.start()
+        self._started_at = time.monotonic()
+        self.logger.info(f"Started {self.num_workers} inference worker processes")
+
+    def _spawn(self, worker_id: int) -> Tuple[Any, Any, Any]:
+        task_queue = self._context.Queue()
+        result_conn, worker_conn = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, self.config, task_queue, worker_conn),
+            name=f"inference-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        # Only the worker writes; our copy would keep the pipe open after it dies
+        worker_conn.close()
+        return task_queue, process, result_conn
+
+    def _restart(self, worker_id: int, reason: str) -> None:
+        """Replace a worker process; jobs still assigned to it fail.
+
+        Blocks for up to ~2s (terminate, join, spawn), so it runs in a thread
+        via ``_restart_async``; the lock is only held to swap the handles.
+        """
+        with self._lock:
+            old_process = self._processes[worker_id]
+        if old_process.is_alive():
+            old_process.terminate()
+            old_process.join(timeout=1)
+            if old_process.is_alive():
+                old_process.kill()
+        old_process.join(timeout=1)
+        task_queue, process, result_conn = self._spawn(worker_id)
+
+        with self._lock:
+            old_queue = self._task_queues[worker_id]
+            # Jobs left in the old queue are dropped; do not block exit on flushing them
+            old_queue.cancel_join_thread()
+            old_queue.close()
+            # The reader thread closes the old result pipe once it has drained it
+            self._task_queues[worker_id], self._processes[worker_id], self._result_conns[worker_id] = (
+                task_queue, process, result_conn
+            )
+            self._reader_wakeup[1].send(True)
+            self._restarts[worker_id] += 1
+            lost = self._fail_jobs(worker_id, f"Inference worker {worker_id} was restarted")
+        self.logger.warning(f"Restarted inference worker {worker_id} ({reason}); {lost} queued jobs failed")
+
+    async def _restart_async(self, worker_id: int, reason: str) -> None:
+        """Restart a worker off the event loop; concurrent callers share one restart"""
+        task = self._restart_tasks.get(worker_id)
+        if task is None:
+            loop = asyncio.get_running_loop()
+            task = asyncio.ensure_future(loop.run_in_executor(None, self._restart, worker_id, reason))
+            self._restart_tasks[worker_id] = task
+            task.add_done_callback(lambda _, worker_id=worker_id: self._restart_tasks.pop(worker_id, None))
+        await asyncio.shield(task)
+
+    def _fail_jobs(self, worker_id: int, error: str) -> int:
+        """Fail every job still assigned to a worker. Call with self._lock held."""
+        self._outstanding[worker_id] = 0
+        lost = [job_id for job_id, assigned in self._assigned.items() if assigned == worker_id]
+        for job_id in lost:
+            del self._assigned[job_id]
+            waiter = self._futures.pop(job_id, None)
+            if waiter is not None:
+                loop, future = waiter
+                loop.call_soon_threadsafe(self._resolve, future, error)
+        return len(lost)
+
+    def _read_results(self) -> None:
+        wakeup = self._reader_wakeup[0]
+        watched: set = set()  # Result pipes not at EOF yet, including those of replaced workers
+        finished: set = set()
+        while True:
+            with self._lock:
+                current = set(self._result_conns)
+            finished &= current
+            watched |= current - finished
+
+            for conn in wait([wakeup, *watched]):
+                if conn is wakeup:
+                    if wakeup.recv() is None:
+                        return
+                    continue
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    # Worker exited: fail its jobs now; it is restarted when a job next picks it
+                    watched.discard(conn)
+                    finished.add(conn)
+                    conn.close()
+                    with self._lock:
+                        if conn in self._result_conns:
+                            worker_id = self._result_conns.index(conn)
+                            self._fail_jobs(worker_id, f"Inference worker {worker_id} exited")
+                    continue
+                self._handle_result(message)
+
+    def _handle_result(self, message: Tuple[int, int, Optional[str], float, int]) -> None:
+        job_id, worker_id, error, busy_seconds, count = message
+        with self._lock:
+            # A job of a restarted worker was already written off
+            if self._assigned.pop(job_id, None) == worker_id:
+                self._outstanding[worker_id] -= 1
+            self._busy_seconds[worker_id] += busy_seconds
+            self._jobs[worker_id] += 1
+            self._items[worker_id] += count
+            if error:
+                self._errors[worker_id] += 1
+            waiter = self._futures.pop(job_id, None)
+        if waiter is not None:
+            loop, future = waiter
+            loop.call_soon_threadsafe(self._resolve, future, error)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, error: Optional[str]) -> None:
+        if future.done():
+            return
+        if error:
+            future.set_exception(RuntimeError(error))
+        else:
+            future.set_result(None)
+
+    async def run(self, texts: List[str], engine: str = ENGINE_HEURISTIC) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Score texts in a worker; returns (labels, confidences, scores) arrays"""
+        count = len(texts)
+        if count == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64), np.zeros(0, dtype=np.float64)
+
+        self.start()
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(item) for item in encoded])
+        text_bytes = int(offsets[-1])
+        text_start, labels_start, confidences_start, scores_start, total = _batch_layout(count, text_bytes)
+
+        shm = shared_memory.SharedMemory(create=True, size=max(total, 1))
+        try:
+            np.ndarray((count + 1,), dtype=np.int64, buffer=shm.buf)[:] = offsets
+            shm.buf[text_start:text_start + text_bytes] = b"".join(encoded)
+
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            job_id = next(self._job_ids)
+            with self._lock:
+                # Least-loaded worker
+                worker_id = min(range(self.num_workers), key=self._outstanding.__getitem__)
+                exitcode = None if self._processes[worker_id].is_alive() else self._processes[worker_id].exitcode
+            if exitcode is not None:
+                await self._restart_async(worker_id, f"exit code {exitcode}")
+            with self._lock:
+                self._outstanding[worker_id] += 1
+                self._assigned[job_id] = worker_id
+                self._futures[job_id] = (loop, future)
+                self._task_queues[worker_id].put((job_id, engine, shm.name, count, text_bytes))
+
+            try:
+                await asyncio.wait_for(future, self.job_timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    # Still assigned: the worker is stuck on it (or on a job queued before it)
+                    stuck = self._assigned.get(job_id) == worker_id
+                if stuck:
+                    await self._restart_async(worker_id, f"job timed out after {self.job_timeout}s")
+                raise
+            finally:
+                with self._lock:
+                    self._futures.pop(job_id, None)
+
+            labels = np.ndarray((count,), dtype=np.int64, buffer=shm.buf, offset=labels_start).copy()
+            confidences = np.ndarray((count,), dtype=np.float64, buffer=shm.buf, offset=confidences_start).copy()
+            scores = np.ndarray((count,), dtype=np.float64, buffer=shm.buf, offset=scores_start).copy()
+            return labels, confidences, scores
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self) -> None:
+        if not self.is_running:
+            return
+
+        for task_queue in self._task_queues:
+            task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+        self._reader_wakeup[1].send(None)
+        if self._reader is not None:
+            self._reader.join(timeout=5)
+        for conn in [*self._result_conns, *self._reader_wakeup]:
+            conn.close()
+
+        self._processes.clear()
+        self._task_queues.clear()
+        self._result_conns.clear()
+        self._futures.clear()
+        self._assigned.clear()
+        self._outstanding = [0] * self.num_workers
+        self._started_at = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-worker utilization (busy time / uptime) and job counters"""
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        workers = []
+        for worker_id in range(self.num_workers):
+            process = self._processes[worker_id] if worker_id < len(self._processes) else None
+            workers.append({
+                'worker_id': worker_id,
+                'alive': bool(process and process.is_alive()),
+                'outstanding_jobs': self._outstanding[worker_id],
+                'jobs': self._jobs[worker_id],
+                'items': self._items[worker_id],
+                'errors': self._errors[worker_id],
+                'restarts': self._restarts[worker_id],
+                'busy_seconds': round(self._busy_seconds[worker_id], 3),
+                'utilization': round(self._busy_seconds[worker_id] / uptime, 4) if uptime else 0.0
+            })
+        return {
+            'num_workers': self.num_workers,
+            'running': self.is_running,
+            'uptime_seconds': round(uptime, 1),
+            'workers': workers
+        }
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from collections import deque
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+from ..models import MLPrediction
+from .ml_service import MLService
+
+
+class InferenceScheduler:
+    """Coalesces prediction requests from concurrent callers into shared batches.
+
+    Every caller enqueues its texts and awaits one future per text. A single
+    worker drains the queue into batches bounded by ``max_batch_size`` and
+    ``max_wait_ms`` (measured from the oldest pending text), hands each batch to
+    ``MLService.predict_batch`` and resolves the callers' futures with their
+    slice of the results.
+    """
+
+    def __init__(
+        self,
+        ml_service: MLService,
+        max_batch_size: int = 256,
+        max_wait_ms: int = 20,
+        max_in_flight: int = 4,
+        enabled: bool = True
+    ):
+        self.ml_service = ml_service
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self.max_in_flight = max(1, max_in_flight)
+        self.enabled = enabled
+        self.logger = logging.getLogger(__name__)
+
+        self._pending: deque = deque()
+        self._has_pending: Optional[asyncio.Event] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+
+        self.stats: Dict[str, int] = {
+            'requests': 0,
+            'texts': 0,
+            'batches': 0,
+            'failed_batches': 0
+        }
+
+    def start(self) -> None:
+        """Start the batching worker on the running event loop"""
+        if self._worker is not None and not self._worker.done():
+            return
+        self._has_pending = asyncio.Event()
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker, wait for dispatched batches and fail anything still queued"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+
+        while self._pending:
+            _, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference scheduler stopped"))
+
+    async def predict(self, texts: List[str]) -> List[MLPrediction]:
+        """Predict texts through the shared queue; results keep the input order"""
+        if not texts:
+            return []
+        if not self.enabled:
+            return await self.ml_service.predict_batch(texts)
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._pending.append((text, future))
+            futures.append(future)
+        self._has_pending.set()
+
+        self.stats['requests'] += 1
+        self.stats['texts'] += len(texts)
+
+        return list(await asyncio.gather(*futures))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._pending:
+                self._has_pending.clear()
+                await self._has_pending.wait()
+                continue
+
+            # Chờ thêm tối đa max_wait kể từ khi có text đầu tiên để gom batch
+            deadline = loop.time() + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._has_pending.clear()
+                try:
+                    await asyncio.wait_for(self._has_pending.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            # Take the slot before popping: if stop() cancels us while we wait, the
+            # texts are still in _pending and get failed there instead of hanging
+            await self._in_flight.acquire()
+            batch = [self._pending.popleft() for _ in range(min(self.max_batch_size, len(self._pending)))]
+            task = asyncio.create_task(self._dispatch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            # Skip texts whose caller has gone away (request cancelled)
+            live = [(text, future) for text, future in batch if not future.done()]
+            if not live:
+                return
+
+            predictions = await self.ml_service.predict_batch([text for text, _ in live])
+            self.stats['batches'] += 1
+
+            for (_, future), prediction in zip(live, predictions):
+                if not future.done():
+                    future.set_result(prediction)
+
+        except Exception as e:
+            self.stats['failed_batches'] += 1
+            self.logger.error(f"Scheduled batch of {len(batch)} texts failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+        finally:
+            self._in_flight.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics"""
+        batches = self.stats['batches']
+        return {
+            **self.stats,
+            'queued': len(self._pending),
+            'in_flight': len(self._batch_tasks),
+            'avg_batch_size': round(self.stats['texts'] / batches, 2) if batches else 0.0
+        }
@@ -0,0 +1,138 @@
+import logging
+import os
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+
+class LocalInferenceEngine:
+    """In-process CPU inference for the VisoBERT seeding classifier.
+
+    Loads the classifier from a local directory. If the directory contains a
+    ``model.onnx`` export it is run with onnxruntime, otherwise the PyTorch
+    weights are loaded with transformers (optionally int8 dynamic-quantized).
+    onnxruntime/transformers/torch are optional and only imported on load.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        num_threads: int = 1,
+        max_length: int = 256,
+        quantize: bool = True
+    ):
+        self.model_path = model_path
+        self.num_threads = max(1, num_threads)
+        self.max_length = max_length
+        self.quantize = quantize
+        self.logger = logging.getLogger(__name__)
+
+        self.backend: Optional[str] = None  # "onnx" hoặc "torch"
+        self.tokenizer = None
+        self.session = None
+        self.model = None
+        self.seeding_index = 1
+        self._load_lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.backend is not None
+
+    def load(self) -> None:
+        """Load tokenizer and model once (thread-safe)"""
+        with self._load_lock:
+            if self.is_loaded:
+                return
+
+            if not os.path.isdir(self.model_path):
+                raise FileNotFoundError(f"Local model directory not found: {self.model_path}")
+
+            from transformers import AutoConfig, AutoTokenizer
+
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+            config = AutoConfig.from_pretrained(self.model_path)
+            self.seeding_index = self._resolve_seeding_index(config.id2label)
+
+            onnx_path = os.path.join(self.model_path, "model.onnx")
+            if os.path.exists(onnx_path):
+                import onnxruntime as ort
+
+                options = ort.SessionOptions()
+                options.intra_op_num_threads = self.num_threads
+                options.inter_op_num_threads = 1
+                self.session = ort.InferenceSession(
+                    onnx_path, options, providers=["CPUExecutionProvider"]
+                )
+                self.backend = "onnx"
+            else:
+                import torch
+                from transformers import AutoModelForSequenceClassification
+
+                torch.set_num_threads(self.num_threads)
+                model = AutoModelForSequenceClassification.from_pretrained(self.model_path)
+                model.eval()
+                if self.quantize:
+                    model = torch.quantization.quantize_dynamic(
+                        model, {torch.nn.Linear}, dtype=torch.qint8
+                    )
+                self.model = model
+                self.backend = "torch"
+
+            self.logger.info(f"Loaded local model from {self.model_path} (backend={self.backend})")
+
+    def predict(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Run one batch synchronously; returns label/confidence dicts in input order"""
+        labels, confidences = self.predict_arrays(texts)
+        return [
+            {"label": int(label), "confidence": float(confidence)}
+            for label, confidence in zip(labels, confidences)
+        ]
+
+    def predict_arrays(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Run one batch synchronously; returns (labels, confidences) arrays"""
+        self.load()
+        if not texts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        probabilities = self._softmax(self._compute_logits(texts))
+        best = probabilities.argmax(axis=1)
+        labels = (best == self.seeding_index).astype(np.int64)
+        confidences = probabilities[np.arange(len(texts)), best]
+        return labels, confidences
+
+    def _compute_logits(self, texts: List[str]) -> np.ndarray:
+        if self.backend == "onnx":
+            encoded = self.tokenizer(
+                texts, padding=True, truncation=True,
+                max_length=self.max_length, return_tensors="np"
+            )
+            input_names = {model_input.name for model_input in self.session.get_inputs()}
+            feeds = {
+                name: value.astype(np.int64)
+                for name, value in encoded.items() if name in input_names
+            }
+            return self.session.run(None, feeds)[0]
+
+        import torch
+
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True,
+            max_length=self.max_length, return_tensors="pt"
+        )
+        with torch.inference_mode():
+            return self.model(**encoded).logits.numpy()
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        shifted = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(shifted)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    @staticmethod
+    def _resolve_seeding_index(id2label: Optional[Dict[Any, str]]) -> int:
+        """Find the output index of the seeding class, defaulting to 1"""
+        for index, name in (id2label or {}).items():
+            if str(name).upper() == "SEEDING":
+                return int(index)
+        return 1
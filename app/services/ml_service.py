@@ -1,13 +1,26 @@
 import asyncio
+import itertools
+import logging
 import random
 import time
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Iterable, AsyncIterator
 import httpx
+import numpy as np
 from ..models import MLPrediction
 from ..config import get_settings
+from ..utils.helpers import estimate_token_count, truncate_to_token_limit
+from .local_inference import LocalInferenceEngine
+from .prediction_cache import PredictionCache
+from .heuristic_engine import HeuristicEngine
+from .resilience import AdaptiveConcurrencyLimiter, CircuitBreaker
+from .inference_pool import InferenceWorkerPool, ENGINE_HEURISTIC, ENGINE_LOCAL
 
 settings = get_settings()
 
+# Remote responses that mean "overloaded, retry later"
+RETRYABLE_STATUS_CODES = {429, 503}
+
 class MLService:
     """Service for ML predictions using Hugging Face VisoBERT model"""
     
@@ -18,7 +31,53 @@ class MLService:
             "Authorization": f"Bearer {settings.huggingface_token}" if settings.huggingface_token else "",
             "Content-Type": "application/json"
         }
-        self.session = httpx.AsyncClient(timeout=settings.model_timeout)
+        # Connection pool keep-alive để các batch dùng lại kết nối tới inference API
+        self.session = httpx.AsyncClient(
+            timeout=settings.model_timeout,
+            limits=httpx.Limits(
+                max_connections=settings.model_max_connections,
+                max_keepalive_connections=settings.model_max_keepalive_connections,
+                keepalive_expiry=settings.model_keepalive_expiry
+            )
+        )
+        self.logger = logging.getLogger(__name__)
+        
+        # Adaptive fan-out and circuit breaker for the remote inference API
+        self.concurrency_limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=settings.model_initial_concurrency,
+            min_limit=settings.model_min_concurrency,
+            max_limit=settings.model_max_concurrency,
+            latency_target=settings.model_latency_target
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=settings.circuit_breaker_failure_threshold,
+            reset_timeout=settings.circuit_breaker_reset_timeout
+        )
+        
+        # Local CPU engine (INFERENCE_BACKEND=local); one worker thread so
+        # intra-op threads are not oversubscribed by concurrent batches
+        self.local_engine: Optional[LocalInferenceEngine] = None
+        self._local_executor: Optional[ThreadPoolExecutor] = None
+        if settings.inference_backend == "local":
+            if settings.local_model_path:
+                self.local_engine = LocalInferenceEngine(
+                    model_path=settings.local_model_path,
+                    num_threads=settings.local_model_threads,
+                    max_length=settings.model_max_sequence_length,
+                    quantize=settings.local_model_quantize
+                )
+                if settings.inference_workers <= 0:
+                    self._local_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-inference")
+            else:
+                self.logger.warning("INFERENCE_BACKEND=local but LOCAL_MODEL_PATH is not set. Using remote/simulation mode.")
+        
+        # Cache dự đoán theo nội dung đã chuẩn hóa + phiên bản model
+        self.prediction_cache: Optional[PredictionCache] = None
+        if settings.prediction_cache_enabled:
+            self.prediction_cache = PredictionCache(
+                max_size=settings.prediction_cache_max_size,
+                ttl=settings.prediction_cache_ttl
+            )
         
         # Enhanced seeding keywords for better detection
         self.seeding_keywords = [
@@ -29,167 +88,453 @@ class MLService:
             'sale', 'giảm giá', 'freeship', 'cod', 'đặt hàng', 'mã giảm'
         ]
         
-        # Seeding patterns
+        # Keyword matching with weights
+        self.keyword_weights = {
+            'shop': 2.0, 'mua': 1.5, 'bán': 2.0, 'uy tín': 1.8,
+            'chất lượng': 1.5, 'inbox': 2.5, 'link': 2.0,
+            'sản phẩm': 1.3, 'đảm bảo': 1.5, 'admin': 2.0,
+            'order': 2.2, 'giá rẻ': 1.8, 'liên hệ': 2.3,
+            'freeship': 2.0, 'cod': 1.8, 'khuyến mãi': 1.5
+        }
+        
+        # Seeding patterns: first keyword followed later by the second one
         self.seeding_patterns = [
-            r'inbox.*shop',
-            r'link.*bio',
-            r'liên hệ.*admin',
-            r'mua.*uy tín',
-            r'shop.*chất lượng',
-            r'đặt hàng.*nhanh',
-            r'freeship.*cod'
+            ('inbox', 'shop'),
+            ('link', 'bio'),
+            ('liên hệ', 'admin'),
+            ('mua', 'uy tín'),
+            ('shop', 'chất lượng'),
+            ('đặt hàng', 'nhanh'),
+            ('freeship', 'cod')
         ]
+        
+        # Compiled once; scores whole batches without touching the network
+        self.heuristic_engine = HeuristicEngine(
+            self.keyword_weights,
+            self.seeding_keywords,
+            self.seeding_patterns
+        )
+        
+        # Worker processes for CPU-bound scoring (INFERENCE_WORKERS > 0);
+        # each holds its own heuristic engine and local model copy
+        self.worker_pool: Optional[InferenceWorkerPool] = None
+        if settings.inference_workers > 0:
+            self.worker_pool = InferenceWorkerPool(
+                num_workers=settings.inference_workers,
+                config={
+                    "keyword_weights": self.keyword_weights,
+                    "seeding_keywords": self.seeding_keywords,
+                    "seeding_patterns": self.seeding_patterns,
+                    "local_model": {
+                        "model_path": settings.local_model_path,
+                        "num_threads": settings.local_model_threads,
+                        "max_length": settings.model_max_sequence_length,
+                        "quantize": settings.local_model_quantize
+                    } if self.local_engine is not None else None
+                },
+                job_timeout=settings.inference_worker_timeout
+            )
+    
+    def start_workers(self) -> None:
+        """Spawn the inference worker processes, if configured"""
+        if self.worker_pool is not None:
+            self.worker_pool.start()
+    
+    @property
+    def inference_mode(self) -> str:
+        """"local", "remote" or "simulation" (heuristic only)"""
+        if self.local_engine is not None:
+            return "local"
+        if settings.huggingface_token:
+            return "remote"
+        return "simulation"
+    
+    @property
+    def model_tag(self) -> str:
+        """Model version tag used to namespace cached predictions"""
+        return f"{settings.model_version}:{self.inference_mode}"
     
     async def predict_single(self, text: str) -> MLPrediction:
         """Predict single comment"""
         start_time = time.time()
         
         try:
-            # Try Hugging Face API first
-            if settings.huggingface_token:
-                prediction = await self._call_huggingface_api(text)
-            else:
-                # Fallback to enhanced simulation
-                prediction = await self._enhanced_simulation(text)
-            
-            processing_time = time.time() - start_time
-            
-            return MLPrediction(
-                label=prediction["label"],
-                confidence=prediction["confidence"],
-                processing_time=processing_time
-            )
+            return (await self.predict_batch([text]))[0]
             
         except Exception as e:
             # Fallback to keyword-based detection
-            return await self._fallback_prediction(text, start_time)
+            return self._fallback_prediction(text, start_time)
     
     async def predict_batch(self, texts: List[str]) -> List[MLPrediction]:
-        """Predict batch of comments with optimized processing"""
+        """Predict batch of comments, serving repeated texts from the prediction cache"""
         try:
-            # Process in smaller batches for better performance
-            batch_size = 10
-            all_predictions = []
+            if not texts:
+                return []
             
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
-                batch_predictions = await asyncio.gather(
-                    *[self.predict_single(text) for text in batch]
-                )
-                all_predictions.extend(batch_predictions)
-                
-                # Small delay between batches to avoid rate limiting
-                if i + batch_size < len(texts):
-                    await asyncio.sleep(0.1)
+            if self.prediction_cache is None or self.inference_mode == "simulation":
+                # Simulation results are never cached, so a lookup could only count a miss
+                return await self._predict_uncached(texts)
+            
+            model_tag = self.model_tag
+            results: List[Optional[MLPrediction]] = [None] * len(texts)
+            pending: Dict[str, List[int]] = {}
             
-            return all_predictions
+            for i, text in enumerate(texts):
+                key = self.prediction_cache.make_key(text, model_tag)
+                if key in pending:
+                    # Duplicate inside the same batch: score it once
+                    pending[key].append(i)
+                    continue
+                cached = self.prediction_cache.get(key)
+                if cached is not None:
+                    results[i] = MLPrediction(
+                        label=cached[0], confidence=cached[1], processing_time=0.0, stage="cache"
+                    )
+                else:
+                    pending[key] = [i]
+            
+            if pending:
+                keys = list(pending)
+                predictions = await self._predict_uncached([texts[pending[key][0]] for key in keys])
+                for key, prediction in zip(keys, predictions):
+                    for i in pending[key]:
+                        results[i] = prediction
+            
+            return results
             
         except Exception as e:
             raise Exception(f"Batch prediction failed: {str(e)}")
     
-    async def _call_huggingface_api(self, text: str) -> Dict[str, Any]:
-        """Call actual Hugging Face API"""
+    async def predict_stream(
+        self,
+        texts: Iterable[str],
+        chunk_size: Optional[int] = None,
+        max_in_flight: Optional[int] = None
+    ) -> AsyncIterator[Tuple[int, MLPrediction]]:
+        """Yield (index, prediction) as each chunk finishes.
+        
+        Texts are consumed lazily in chunks; at most max_in_flight chunks are
+        being scored at once, so results can be used before the whole input
+        has been predicted. Order across chunks is completion order.
+        """
+        chunk_size = max(1, chunk_size or settings.stream_chunk_size)
+        max_in_flight = max(1, max_in_flight or settings.stream_max_in_flight)
+        
+        iterator = iter(texts)
+        exhausted = False
+        offset = 0
+        pending: Dict[asyncio.Task, int] = {}
+        
         try:
-            payload = {"inputs": text}
-            
-            response = await self.session.post(
-                self.api_url,
-                headers=self.headers,
-                json=payload
+            while True:
+                while not exhausted and len(pending) < max_in_flight:
+                    chunk = list(itertools.islice(iterator, chunk_size))
+                    if not chunk:
+                        exhausted = True
+                        break
+                    pending[asyncio.create_task(self.predict_batch(chunk))] = offset
+                    offset += len(chunk)
+                
+                if not pending:
+                    break
+                
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    start = pending.pop(task)
+                    for i, prediction in enumerate(task.result()):
+                        yield start + i, prediction
+        finally:
+            # Consumer stopped early or a chunk failed: drop the remaining work
+            for task in pending:
+                task.cancel()
+    
+    async def _predict_uncached(self, texts: List[str]) -> List[MLPrediction]:
+        """Run inference, routing clear-cut comments around the model in cascade mode"""
+        if self.inference_mode == "simulation":
+            # Simulation mode: heuristic scoring of the whole batch in one pass. Not cached:
+            # the cache key ignores punctuation, which the heuristic scores
+            return await self._heuristic_predictions(texts, time.time(), stage="simulation")
+        
+        if self.local_engine is None and self.circuit_breaker.is_open:
+            # Backend unhealthy: score the whole batch on the fast heuristic path
+            return await self._heuristic_predictions(texts, time.time())
+        
+        if not settings.cascade_enabled:
+            return await self._predict_with_model(texts)
+        
+        # Stage 1: heuristic scores; only comments inside the uncertainty band go to the model
+        start_time = time.time()
+        labels, confidences, scores = await self._score_heuristic(texts)
+        certain = (scores <= settings.cascade_low_score) | (scores >= settings.cascade_high_score)
+        
+        results: List[Optional[MLPrediction]] = [None] * len(texts)
+        processing_time = (time.time() - start_time) / len(texts)
+        for i in np.flatnonzero(certain):
+            results[i] = MLPrediction(
+                label=int(labels[i]),
+                confidence=float(confidences[i]),
+                processing_time=processing_time,
+                stage="heuristic"
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                # Parse Hugging Face response format
-                if isinstance(result, list) and len(result) > 0:
-                    predictions = result[0]
-                    # Find the prediction with highest score
-                    best_pred = max(predictions, key=lambda x: x['score'])
-                    label = 1 if best_pred['label'] == 'SEEDING' else 0
-                    confidence = best_pred['score']
-                    
-                    return {
-                        "label": label,
-                        "confidence": confidence
-                    }
-            
-            # Fallback if API call fails
-            return await self._enhanced_simulation(text)
-            
-        except Exception:
-            return await self._enhanced_simulation(text)
+        
+        # Stage 2: VisoBERT for the ambiguous comments
+        uncertain = np.flatnonzero(~certain).tolist()
+        if uncertain:
+            predictions = await self._predict_with_model([texts[i] for i in uncertain])
+            for i, prediction in zip(uncertain, predictions):
+                results[i] = prediction
+        
+        return results
     
-    async def _enhanced_simulation(self, text: str) -> Dict[str, Any]:
-        """Enhanced simulation with better accuracy"""
-        import re
+    async def _predict_with_model(self, texts: List[str]) -> List[MLPrediction]:
+        """Run the model on length-bucketed batches; results keep the input order"""
+        # Cắt bớt bình luận quá dài trước khi gửi tới model
+        model_texts = [
+            truncate_to_token_limit(text, settings.model_max_sequence_length) for text in texts
+        ]
+        batches = self._plan_batches(model_texts)
         
-        # Simulate API delay
-        await asyncio.sleep(random.uniform(0.1, 0.3))
+        if self.local_engine is not None and self.worker_pool is None:
+            # Single in-process model: run batches one after another
+            batch_results = []
+            for indices in batches:
+                batch_results.append(await self._predict_local_batch([model_texts[i] for i in indices]))
+        elif self.local_engine is not None:
+            # One batch per worker process at a time
+            batch_results = await asyncio.gather(
+                *[self._predict_local_batch([model_texts[i] for i in indices]) for indices in batches]
+            )
+        else:
+            # Concurrency is bounded by the adaptive limiter
+            batch_results = await asyncio.gather(
+                *[self._predict_remote_batch([model_texts[i] for i in indices]) for indices in batches]
+            )
         
-        text_lower = text.lower()
-        seeding_score = 0
+        results: List[Optional[MLPrediction]] = [None] * len(texts)
+        for indices, (predictions, scored_by_model) in zip(batches, batch_results):
+            for i, prediction in zip(indices, predictions):
+                results[i] = prediction
+            if scored_by_model:
+                self._cache_predictions([texts[i] for i in indices], predictions)
         
-        # Keyword matching with weights
-        keyword_weights = {
-            'shop': 2.0, 'mua': 1.5, 'bán': 2.0, 'uy tín': 1.8,
-            'chất lượng': 1.5, 'inbox': 2.5, 'link': 2.0,
-            'sản phẩm': 1.3, 'đảm bảo': 1.5, 'admin': 2.0,
-            'order': 2.2, 'giá rẻ': 1.8, 'liên hệ': 2.3,
-            'freeship': 2.0, 'cod': 1.8, 'khuyến mãi': 1.5
-        }
+        return results
+    
+    def _plan_batches(self, texts: List[str]) -> List[List[int]]:
+        """Group text indices into length buckets bounded by a padded token budget.
+        
+        Texts are sorted by estimated token count so each batch holds texts of
+        similar length; a batch is closed when (count x longest text) would
+        exceed MODEL_BATCH_TOKEN_BUDGET or it reaches MODEL_BATCH_SIZE texts.
+        """
+        max_tokens = settings.model_max_sequence_length
+        token_budget = max(settings.model_batch_token_budget, max_tokens)
+        max_count = max(1, settings.model_batch_size)
+        
+        lengths = [min(estimate_token_count(text), max_tokens) for text in texts]
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
         
-        for keyword, weight in keyword_weights.items():
-            if keyword in text_lower:
-                seeding_score += weight
+        batches: List[List[int]] = []
+        current: List[int] = []
+        for i in order:
+            # Sorted ascending, so the text being added sets the padded length
+            if current and (len(current) >= max_count or (len(current) + 1) * lengths[i] > token_budget):
+                batches.append(current)
+                current = []
+            current.append(i)
+        if current:
+            batches.append(current)
         
-        # Pattern matching
-        for pattern in self.seeding_patterns:
-            if re.search(pattern, text_lower):
-                seeding_score += 2.0
+        return batches
+    
+    def _cache_predictions(self, texts: List[str], predictions: List[MLPrediction]) -> None:
+        """Store model outputs; heuristic, simulation and fallback predictions are never cached"""
+        if self.prediction_cache is None:
+            return
+        model_tag = self.model_tag
+        for text, prediction in zip(texts, predictions):
+            self.prediction_cache.set(
+                self.prediction_cache.make_key(text, model_tag),
+                prediction.label,
+                prediction.confidence
+            )
+    
+    async def _predict_remote_batch(self, texts: List[str]) -> Tuple[List[MLPrediction], bool]:
+        """Score one batch with a single inference request.
         
-        # Length and structure analysis
-        if len(text.split()) > 15:  # Long comments more likely to be seeding
-            seeding_score += 0.5
+        Returns the predictions and whether they came from the model (False
+        when the batch fell back to the heuristic engine).
+        """
+        start_time = time.time()
+        if not self.circuit_breaker.allow_request():
+            return await self._heuristic_predictions(texts, start_time), False
         
-        if '!' in text or '?' in text:  # Exclamation/question marks
-            seeding_score += 0.3
+        # Every exit must settle the breaker, or a half-open probe stays in flight forever
+        try:
+            results = await self._call_huggingface_api_batch(texts)
+        except asyncio.CancelledError:
+            self.circuit_breaker.release_probe()
+            raise
+        except Exception as e:
+            self.logger.warning(f"Inference API batch failed: {e}")
+            results = None
         
-        # Contact information patterns
-        if re.search(r'\d{10,11}', text):  # Phone numbers
-            seeding_score += 2.0
+        if results is None:
+            self.circuit_breaker.record_failure()
+            return await self._heuristic_predictions(texts, start_time), False
         
-        if re.search(r'zalo|telegram|facebook', text_lower):
-            seeding_score += 1.5
+        self.circuit_breaker.record_success()
         
-        # Determine prediction
-        threshold = 3.0
-        if seeding_score >= threshold:
-            label = 1
-            confidence = min(0.65 + (seeding_score - threshold) * 0.1, 0.95)
-        else:
-            label = 0
-            confidence = max(0.6, 0.9 - (seeding_score * 0.1))
+        # Thời gian xử lý được chia đều cho các bình luận trong batch
+        processing_time = (time.time() - start_time) / len(texts)
+        predictions = [
+            MLPrediction(
+                label=result["label"],
+                confidence=result["confidence"],
+                processing_time=processing_time,
+                stage="model"
+            )
+            for result in results
+        ]
+        return predictions, True
+    
+    async def _predict_local_batch(self, texts: List[str]) -> Tuple[List[MLPrediction], bool]:
+        """Score one batch with the local engine off the event loop"""
+        start_time = time.time()
+        try:
+            if self.worker_pool is not None:
+                labels, confidences, _ = await self.worker_pool.run(texts, engine=ENGINE_LOCAL)
+            else:
+                loop = asyncio.get_running_loop()
+                labels, confidences = await loop.run_in_executor(
+                    self._local_executor, self.local_engine.predict_arrays, texts
+                )
+        except Exception as e:
+            self.logger.warning(f"Local inference failed, using simulation: {e}")
+            return await self._heuristic_predictions(texts, start_time), False
         
-        # Add some realistic variance
-        confidence += random.uniform(-0.05, 0.05)
-        confidence = max(0.5, min(0.98, confidence))
+        processing_time = (time.time() - start_time) / len(texts)
+        predictions = [
+            MLPrediction(
+                label=int(label),
+                confidence=float(confidence),
+                processing_time=processing_time,
+                stage="model"
+            )
+            for label, confidence in zip(labels, confidences)
+        ]
+        return predictions, True
+    
+    async def _score_heuristic(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Heuristic (labels, confidences, scores), in a worker process when the pool is enabled"""
+        if self.worker_pool is not None:
+            try:
+                return await self.worker_pool.run(texts, engine=ENGINE_HEURISTIC)
+            except Exception as e:
+                self.logger.warning(f"Inference worker failed, scoring in-process: {e}")
+        scores = self.heuristic_engine.score_batch(texts)
+        labels, confidences = self.heuristic_engine.threshold_scores(scores)
+        return labels, confidences, scores
+    
+    async def _heuristic_predictions(
+        self,
+        texts: List[str],
+        start_time: float,
+        stage: str = "fallback"
+    ) -> List[MLPrediction]:
+        """Score a batch with the heuristic engine (simulation mode and fallback)"""
+        try:
+            labels, confidences, _ = await self._score_heuristic(texts)
+        except Exception:
+            return [self._fallback_prediction(text, start_time) for text in texts]
+        
+        processing_time = (time.time() - start_time) / len(texts)
+        return [
+            MLPrediction(
+                label=int(label),
+                confidence=float(confidence),
+                processing_time=processing_time,
+                stage=stage
+            )
+            for label, confidence in zip(labels, confidences)
+        ]
+    
+    async def _call_huggingface_api_batch(self, texts: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Call Hugging Face API with many inputs; returns None if the batch failed.
+        
+        Overload responses (429/503) and transport errors are retried with
+        jittered exponential backoff, each attempt holding a limiter slot.
+        """
+        # Our length estimate is approximate; let the endpoint truncate whatever still exceeds the model limit
+        payload = {
+            "inputs": texts,
+            "parameters": {"truncation": True, "max_length": settings.model_max_sequence_length}
+        }
+        
+        for attempt in range(settings.model_max_retries + 1):
+            if attempt > 0:
+                if self.circuit_breaker.is_open:
+                    return None
+                # Full jitter: ngẫu nhiên trong [0, base * 2^attempt]
+                await asyncio.sleep(random.uniform(0, settings.model_retry_base_delay * (2 ** attempt)))
+            
+            await self.concurrency_limiter.acquire()
+            call_start = time.monotonic()
+            overloaded = False
+            try:
+                response = await self.session.post(
+                    self.api_url,
+                    headers=self.headers,
+                    json=payload
+                )
+                overloaded = response.status_code in RETRYABLE_STATUS_CODES
+            except httpx.HTTPError as e:
+                overloaded = True
+                self.logger.warning(f"Inference API call failed (attempt {attempt + 1}): {e}")
+                continue
+            finally:
+                # Every exit (cancellation included) must free the slot, or later calls wait forever
+                await asyncio.shield(
+                    self.concurrency_limiter.release(time.monotonic() - call_start, overloaded=overloaded)
+                )
+            
+            if overloaded:
+                self.logger.warning(f"Inference API overloaded ({response.status_code}, attempt {attempt + 1})")
+                continue
+            
+            if response.status_code != 200:
+                return None
+            
+            try:
+                result = response.json()
+                # Batched response: one list of label scores per input, same order
+                if not isinstance(result, list) or len(result) != len(texts):
+                    return None
+                return [self._parse_label_scores(predictions) for predictions in result]
+            except Exception:
+                return None
+        
+        return None
+    
+    def _parse_label_scores(self, predictions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Pick the highest scoring label from a Hugging Face classification output"""
+        # Find the prediction with highest score
+        best_pred = max(predictions, key=lambda x: x['score'])
+        label = 1 if best_pred['label'] == 'SEEDING' else 0
         
         return {
             "label": label,
-            "confidence": confidence
+            "confidence": best_pred['score']
         }
     
-    async def _fallback_prediction(self, text: str, start_time: float) -> MLPrediction:
+    def _fallback_prediction(self, text: str, start_time: float) -> MLPrediction:
         """Simple fallback prediction"""
-        text_lower = text.lower()
-        
-        seeding_indicators = sum(1 for keyword in self.seeding_keywords if keyword in text_lower)
+        seeding_indicators = int(self.heuristic_engine.count_seeding_keywords([text])[0])
         
         if seeding_indicators >= 2:
             label = 1
             confidence = 0.75
         elif seeding_indicators == 1:
-            label = random.choice([0, 1])
+            label = 0
             confidence = 0.6
         else:
             label = 0
@@ -200,7 +545,8 @@ class MLService:
         return MLPrediction(
             label=label,
             confidence=confidence,
-            processing_time=processing_time
+            processing_time=processing_time,
+            stage="fallback"
         )
     
     async def get_model_info(self) -> Dict[str, Any]:
@@ -213,9 +559,28 @@ class MLService:
             "task": "Text Classification",
             "labels": ["Not Seeding", "Seeding"],
             "last_updated": "2024-01-15",
-            "api_status": "connected" if settings.huggingface_token else "simulation_mode"
+            "api_status": self._api_status()
+        }
+    
+    def _api_status(self) -> str:
+        if self.local_engine is not None:
+            if self.worker_pool is not None:
+                return "local_worker_pool"
+            return f"local_{self.local_engine.backend}" if self.local_engine.is_loaded else "local_not_loaded"
+        return "connected" if settings.huggingface_token else "simulation_mode"
+    
+    def get_backend_health(self) -> Dict[str, Any]:
+        """Circuit breaker state and adaptive concurrency of the remote backend"""
+        return {
+            "circuit_breaker": self.circuit_breaker.get_state(),
+            "concurrency": self.concurrency_limiter.get_stats(),
+            "worker_pool": self.worker_pool.get_stats() if self.worker_pool is not None else None
         }
     
     async def close(self):
-        """Close HTTP session"""
-        await self.session.aclose()
\ No newline at end of file
+        """Close HTTP session and local inference worker"""
+        await self.session.aclose()
+        if self._local_executor is not None:
+            self._local_executor.shutdown(wait=False)
+        if self.worker_pool is not None:
+            self.worker_pool.close()
\ No newline at end of file
@@ -0,0 +1,66 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from ..utils.helpers import generate_content_hash
+
+
+class PredictionCache:
+    """Bounded LRU/TTL cache of comment predictions.
+
+    Keys combine a model-version tag with ``generate_content_hash`` of the
+    comment, so identical or trivially varied texts (whitespace, punctuation,
+    case) share one entry and a model change never serves stale labels.
+    """
+
+    def __init__(self, max_size: int = 100000, ttl: int = 86400):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        # key -> (expires_at, label, confidence)
+        self._entries: "OrderedDict[str, Tuple[float, int, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(text: str, model_tag: str) -> str:
+        return f"{model_tag}:{generate_content_hash(text)}"
+
+    def get(self, key: str) -> Optional[Tuple[int, float]]:
+        """Return (label, confidence) for a key, or None on miss/expiry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, label, confidence = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return label, confidence
+
+    def set(self, key: str, label: int, confidence: float) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, label, confidence)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit for calls to a remote backend.
+
+    The limit grows by roughly one slot per window of fast successful calls
+    (additive increase) and is cut multiplicatively when a call is slow or the
+    backend signals overload (429/503, timeouts).
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        latency_target: float = 5.0,
+        backoff_ratio: float = 0.5,
+        slow_ratio: float = 0.9
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.latency_target = latency_target
+        self.backoff_ratio = backoff_ratio
+        self.slow_ratio = slow_ratio
+
+        self.in_flight = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self.stats = {
+            'successes': 0,
+            'overloads': 0,
+            'slow_calls': 0
+        }
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so the limiter can be built outside a running loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self) -> None:
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency: float, overloaded: bool = False) -> None:
+        """Release a slot and adjust the limit from the call outcome"""
+        if overloaded:
+            self.stats['overloads'] += 1
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        elif latency > self.latency_target:
+            self.stats['slow_calls'] += 1
+            self.limit = max(self.min_limit, self.limit * self.slow_ratio)
+        else:
+            self.stats['successes'] += 1
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'limit': int(self.limit),
+            'min_limit': self.min_limit,
+            'max_limit': self.max_limit,
+            'in_flight': self.in_flight,
+            **self.stats
+        }
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probe"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN and not self._reset_timeout_elapsed()
+
+    def _reset_timeout_elapsed(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def allow_request(self) -> bool:
+        """Whether a call may go to the backend; in half-open state only one probe is allowed"""
+        if self.state == self.OPEN:
+            if not self._reset_timeout_elapsed():
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Give up a half-open probe without a verdict (e.g. the call was cancelled)"""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def get_state(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == self.OPEN and self.opened_at is not None:
+            retry_in = max(0.0, round(self.reset_timeout - (time.monotonic() - self.opened_at), 1))
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'failure_threshold': self.failure_threshold,
+            'times_opened': self.times_opened,
+            'retry_in_seconds': retry_in
+        }
@@ -0,0 +1,41 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one shared task.
+
+    The first caller for a key starts the work; callers arriving while it
+    runs await the same task and get the same result (or exception). A
+    caller that is cancelled does not cancel the shared work.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            'calls': 0,
+            'executions': 0,
+            'coalesced': 0
+        }
+
+    async def do(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats['calls'] += 1
+        task = self._tasks.get(key)
+        if task is None:
+            self.stats['executions'] += 1
+            task = asyncio.create_task(work())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        else:
+            self.stats['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the exception as retrieved when every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {'in_flight': len(self._tasks), **self.stats}
@@ -1,14 +1,22 @@
 import asyncio
 import logging
+import re
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Optional, Set
 import httpx
 
-from TikTokApi import TikTokApi as OfficialTikTokApi
 from TikTokApi.exceptions import TikTokException, EmptyResponseException
 
 from ..models import Comment, TikTokVideoInfo
-from ..config import Settings, get_settings, load_and_get_tiktok_token, rotate_tiktok_token
+from ..config import Settings, get_settings, get_proxy_pool, get_tiktok_token_pool
+from .tiktok_session_pool import PooledSession, TikTokSessionPool, TikTokSessionPoolError
+from .crawl_state import CrawlStateStore
+from .proxy_pool import ProxyPool
+from .token_scheduler import TokenScheduler
+
+# Errors that point at the session itself (token, proxy); the session is retired instead of reused
+SESSION_ERRORS = (EmptyResponseException, TikTokException, httpx.ProxyError)
 
 
 class TikTokService:
@@ -23,150 +31,229 @@ class TikTokService:
                 "TikTok crawling will likely fail. Please set at least one in your .env file or config."
             )
         
-        if self.settings.proxy_address:
-            self.logger.info(f"Proxy configured: {self.settings.proxy_address}:{self.settings.proxy_port}")
+        self.proxy_pool = ProxyPool(
+            get_proxy_pool(),
+            max_sessions=self.settings.proxy_max_sessions,
+            failure_threshold=self.settings.proxy_failure_threshold,
+            probe_url=self.settings.proxy_probe_url,
+            probe_interval=self.settings.proxy_probe_interval,
+            probe_timeout=self.settings.proxy_probe_timeout
+        )
+        if self.proxy_pool.enabled:
+            self.logger.info(f"Proxy pool configured with {len(self.proxy_pool.proxies)} proxies")
         else:
             self.logger.warning("No proxy configuration found. TikTok might block requests if not using proxy.")
 
-    async def _get_playwright_proxy_object(self) -> Optional[Dict[str, str]]:
-        """Helper to create Playwright-compatible proxy object from settings."""
-        if self.settings.proxy_address and self.settings.proxy_port:
-            server_url = f"http://{self.settings.proxy_address}:{self.settings.proxy_port}"
-            proxy_obj = {"server": server_url}
-            if self.settings.proxy_username:
-                proxy_obj["username"] = self.settings.proxy_username
-            if self.settings.proxy_password:
-                proxy_obj["password"] = self.settings.proxy_password
-            return proxy_obj
-        return None
+        self.token_scheduler = TokenScheduler(
+            get_tiktok_token_pool(),
+            strategy=self.settings.token_selection_strategy,
+            max_concurrency=self.settings.token_max_concurrency,
+            failure_threshold=self.settings.token_failure_threshold,
+            failure_window=self.settings.token_failure_window,
+            cooldown=self.settings.token_cooldown,
+            max_cooldown=self.settings.token_max_cooldown
+        )
+
+        # Playwright sessions được tạo một lần và dùng lại thay vì mở browser mới cho mỗi lần crawl
+        self.session_pool = TikTokSessionPool(
+            size=self.settings.tiktok_session_pool_size,
+            token_scheduler=self.token_scheduler,
+            proxy_pool=self.proxy_pool,
+            max_uses=self.settings.tiktok_session_max_uses,
+            max_failures=self.settings.tiktok_session_max_failures,
+            session_ttl=self.settings.tiktok_session_ttl,
+            sleep_after=self.settings.tiktok_session_sleep_after,
+            acquire_timeout=self.settings.tiktok_session_acquire_timeout
+        )
+        self._warmup_task: Optional[asyncio.Task] = None
+
+        # Trạng thái crawl theo từng video (bình luận mới nhất, id đã thấy, dự đoán đã lưu)
+        self.crawl_state = CrawlStateStore(
+            self.settings.crawl_state_dir,
+            max_comments=self.settings.max_comments_to_crawl,
+            max_videos=self.settings.crawl_state_memory_size
+        )
+
+    def start(self):
+        """Start proxy health probes and warm up the session pool in the background"""
+        self.proxy_pool.start()
+        if self.settings.tiktok_session_warmup and self._warmup_task is None:
+            self._warmup_task = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self):
+        try:
+            await self.session_pool.start()
+        except Exception as e:
+            self.logger.warning(f"Could not warm up TikTok session pool: {e}")
+
+    @staticmethod
+    def _video_for_comments(api, url: str):
+        """Video handle for crawling comments; with the numeric id TikTokApi skips its blocking redirect lookup"""
+        match = re.search(r'/video/(\d+)', url)
+        if match:
+            return api.video(id=match.group(1))
+        return api.video(url=url)
+
+    async def _iter_video_comments(
+        self,
+        video,
+        seen_ids: Optional[Set[str]] = None,
+        newest_timestamp: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield comment dicts of a video, skipping known comments.
+
+        TikTok does not list comments in time order, so a run of known ids
+        alone does not mean the rest is old. The crawl only stops early after
+        ``incremental_stop_after_known`` consecutive known comments that are
+        also not newer than ``newest_timestamp`` (the newest comment seen by
+        the previous crawl); any newer comment restarts the count. Without
+        ``newest_timestamp`` the whole list is walked.
+        """
+        comment_count_api = 0
+        known_streak = 0
+        async for comment_raw in video.comments(count=self.settings.max_comments_to_crawl):
+            comment_dict_api = comment_raw.as_dict
+            timestamp_unix = comment_dict_api.get("create_time")
+            if seen_ids is not None and comment_dict_api.get("cid") in seen_ids:
+                if newest_timestamp is not None and timestamp_unix and timestamp_unix <= newest_timestamp:
+                    known_streak += 1
+                    if known_streak >= self.settings.incremental_stop_after_known:
+                        self.logger.info(f"Reached {known_streak} old known comments in a row, stopping incremental crawl")
+                        break
+                else:
+                    known_streak = 0
+                continue
+            known_streak = 0
+            user_info = comment_dict_api.get("user", {})
+            timestamp_iso = datetime.fromtimestamp(timestamp_unix).isoformat() if timestamp_unix else datetime.now().isoformat()
+
+            yield {
+                "comment_id": comment_dict_api.get("cid", f"generated_cid_{comment_count_api}"),
+                "comment_text": comment_dict_api.get("text", ""),
+                "like_count": comment_dict_api.get("digg_count", 0),
+                "timestamp": timestamp_iso,
+                "user_id": user_info.get("id", user_info.get("unique_id", f"generated_user_{comment_count_api}")),
+            }
+            comment_count_api += 1
+            if comment_count_api % 20 == 0:
+                self.logger.info(f"Crawled {comment_count_api} comments for video...")
+
+    async def stream_comments(
+        self,
+        url: str,
+        seen_ids: Optional[Set[str]] = None,
+        newest_timestamp: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield comments as they are crawled.
+
+        Like ``extract_comments`` but without collecting the whole list first.
+        A failed attempt is retried with another session only while nothing
+        has been yielded yet; after that the crawl ends with what was received.
+        """
+        self.logger.info(f"Streaming comments for URL: {url}")
+        yielded = 0
 
-    async def extract_comments(self, url: str) -> List[Dict[str, Any]]:
+        for attempt in range(self.max_token_rotation_attempts):
+            try:
+                async with self._lease() as session:
+                    video = self._video_for_comments(session.api, url)
+                    async for comment_obj in self._iter_video_comments(video, seen_ids, newest_timestamp):
+                        yield comment_obj
+                        yielded += 1
+                    self.session_pool.mark_success(session)
+
+                self.logger.info(f"Successfully streamed {yielded} comments for video URL: {url}")
+                return
+
+            except TikTokSessionPoolError as e:
+                self.logger.error(f"No TikTok session available: {e}")
+                return
+
+            except SESSION_ERRORS as e:
+                self.logger.warning(f"TikTok error while streaming comments for {url} (attempt {attempt + 1}): {e}")
+
+            except Exception as e:
+                self.logger.error(f"Unexpected error while streaming comments for {url} (attempt {attempt + 1}): {e}", exc_info=True)
+
+            if yielded:
+                self.logger.warning(f"Crawl of {url} interrupted after {yielded} comments")
+                return
+
+    async def extract_comments(
+        self,
+        url: str,
+        seen_ids: Optional[Set[str]] = None,
+        newest_timestamp: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Crawl comments of a video.
+
+        With ``seen_ids`` only comments not seen before are returned; with
+        ``newest_timestamp`` as well the crawl may stop early once it only
+        meets old known comments (see ``_iter_video_comments``).
+        """
         comments_data: List[Dict[str, Any]] = []
         self.logger.info(f"Attempting to crawl comments for URL: {url}")
         
-        proxy_config = self.settings.httpx_proxies
-        
         for attempt in range(self.max_token_rotation_attempts):
-            current_token = load_and_get_tiktok_token()
-            if not current_token:
-                self.logger.error("No valid msToken available. Cannot fetch comments.")
-                return []
-            
-            api_instance = None 
             try:
                 self.logger.info(f"Attempt {attempt + 1}/{self.max_token_rotation_attempts} using msToken and proxy")
-                
-                # Khởi tạo TikTokApi
-                api_instance = OfficialTikTokApi() 
-                
-                playwright_proxy_obj = await self._get_playwright_proxy_object()
-
-                create_sessions_kwargs = {
-                    "ms_tokens": [current_token],
-                    "num_sessions": 1,
-                    "headless": True,
-                    "sleep_after": 3
-                }
-                
-                if playwright_proxy_obj:
-                    # Truyền một list chứa đối tượng proxy, vì TikTokApi có thể dùng random.choice()
-                    create_sessions_kwargs["proxies"] = [playwright_proxy_obj]
-                
-                await api_instance.create_sessions(**create_sessions_kwargs)
-
-                video = api_instance.video(url=url) 
-                
-                comment_count_api = 0
-                async for comment_raw in video.comments(count=self.settings.max_comments_to_crawl):
-                    comment_dict_api = comment_raw.as_dict
-                    user_info = comment_dict_api.get("user", {})
-                    timestamp_unix = comment_dict_api.get("create_time")
-                    timestamp_iso = datetime.fromtimestamp(timestamp_unix).isoformat() if timestamp_unix else datetime.now().isoformat()
-
-                    comment_obj = {
-                        "comment_id": comment_dict_api.get("cid", f"generated_cid_{comment_count_api}"),
-                        "comment_text": comment_dict_api.get("text", ""),
-                        "like_count": comment_dict_api.get("digg_count", 0),
-                        "timestamp": timestamp_iso,
-                        "user_id": user_info.get("id", user_info.get("unique_id", f"generated_user_{comment_count_api}")),
-                    }
-                    comments_data.append(comment_obj)
-                    comment_count_api += 1
-                    if comment_count_api % 20 == 0:
-                        self.logger.info(f"Crawled {comment_count_api} comments for video...")
-                
+
+                async with self._lease() as session:
+                    # Bắt đầu lại mỗi lần thử để không bị trùng bình luận của lần thử trước
+                    comments_data = []
+                    video = self._video_for_comments(session.api, url)
+
+                    async for comment_obj in self._iter_video_comments(video, seen_ids, newest_timestamp):
+                        comments_data.append(comment_obj)
+
+                    self.session_pool.mark_success(session)
+
                 self.logger.info(f"Successfully crawled {len(comments_data)} comments for video URL: {url}")
                 break
-                
+
+            except TikTokSessionPoolError as e:
+                self.logger.error(f"No TikTok session available: {e}")
+                break
+
             except EmptyResponseException as e:
                 self.logger.warning(f"TikTok returned empty response (attempt {attempt + 1}): {e}")
                 if attempt < self.max_token_rotation_attempts - 1:
-                    self.logger.info("Rotating to next token and retrying...")
-                    if not rotate_tiktok_token():
-                        self.logger.error("Failed to rotate token (pool may be empty). Giving up.")
-                        break
+                    self.logger.info("Recycling session and retrying with another token...")
                 else:
                     self.logger.error(f"Max retry attempts reached. Failed to crawl using any available token.")
-            
+
             except TikTokException as e:
                 self.logger.error(f"TikTok API error while extracting comments for {url} (attempt {attempt + 1}): {e}")
                 if attempt < self.max_token_rotation_attempts - 1:
-                    self.logger.info("This might be a token issue. Rotating to next token and retrying...")
-                    if not rotate_tiktok_token():
-                        self.logger.error("Failed to rotate token (pool may be empty). Giving up.")
-                        break
+                    self.logger.info("This might be a token issue. Recycling session and retrying...")
                 else:
                     self.logger.error(f"Max retry attempts reached. Failed to crawl using any available token.")
-            
+
             except httpx.ProxyError as e:
                 self.logger.error(f"Proxy error while crawling comments: {e}")
                 break
-                
+
             except Exception as e:
                 self.logger.error(f"Unexpected error while extracting comments for {url} (attempt {attempt + 1}): {e}", exc_info=True)
                 if attempt < self.max_token_rotation_attempts - 1:
-                    self.logger.info("Retrying with same token...")
+                    self.logger.info("Retrying...")
                 else:
                     self.logger.error("Max retry attempts reached.")
-            
-            finally:
-                if api_instance:
-                    pass 
-                    
+
         return comments_data
     
     async def get_video_info(self, url: str) -> Optional[TikTokVideoInfo]:
         self.logger.info(f"Attempting to fetch video info for URL: {url}")
         
         for attempt in range(self.max_token_rotation_attempts):
-            current_token = load_and_get_tiktok_token()
-            if not current_token:
-                self.logger.error("No valid msToken available. Cannot fetch video info.")
-                return None
-            
-            api_instance = None
             try:
                 self.logger.info(f"Attempt {attempt + 1}/{self.max_token_rotation_attempts} to fetch video info")
-                
-                # Khởi tạo TikTokApi
-                api_instance = OfficialTikTokApi()
-                
-                playwright_proxy_obj = await self._get_playwright_proxy_object()
-
-                create_sessions_kwargs = {
-                    "ms_tokens": [current_token],
-                    "num_sessions": 1,
-                    "headless": True,
-                    "sleep_after": 3
-                }
-                if playwright_proxy_obj:
-                    create_sessions_kwargs["proxies"] = [playwright_proxy_obj]
-
-                await api_instance.create_sessions(**create_sessions_kwargs)
-                
-                video_obj_api = api_instance.video(url=url)
-                video_info_api = await video_obj_api.info() 
-                
+
+                async with self._lease() as session:
+                    video_obj_api = session.api.video(url=url)
+                    video_info_api = await video_obj_api.info()
+                    self.session_pool.mark_success(session)
+
                 author_info = video_info_api.get("author", {})
                 stats_info = video_info_api.get("stats", {})
                 created_time_unix = video_info_api.get("createTime")
@@ -185,45 +272,75 @@ class TikTokService:
                 self.logger.info(f"Successfully fetched video info for ID: {video_data.video_id}")
                 return video_data
 
+            except TikTokSessionPoolError as e:
+                self.logger.error(f"No TikTok session available: {e}")
+                break
+
             except EmptyResponseException as e:
                 self.logger.warning(f"TikTok returned empty response for video info (attempt {attempt + 1}): {e}")
                 if attempt < self.max_token_rotation_attempts - 1:
-                    self.logger.info("Rotating to next token and retrying...")
-                    if not rotate_tiktok_token():
-                        self.logger.error("Failed to rotate token (pool may be empty). Giving up.")
-                        break
+                    self.logger.info("Recycling session and retrying with another token...")
                 else:
                     self.logger.error(f"Max retry attempts reached. Failed to get video info using any available token.")
 
             except TikTokException as e:
                 self.logger.error(f"TikTok API error while fetching video info for {url} (attempt {attempt + 1}): {e}")
                 if attempt < self.max_token_rotation_attempts - 1:
-                    self.logger.info("This might be a token issue. Rotating to next token and retrying...")
-                    if not rotate_tiktok_token():
-                        self.logger.error("Failed to rotate token (pool may be empty). Giving up.")
-                        break
+                    self.logger.info("This might be a token issue. Recycling session and retrying...")
                 else:
                     self.logger.error(f"Max retry attempts reached. Failed to get video info using any available token.")
-            
+
             except httpx.ProxyError as e:
                 self.logger.error(f"Proxy error while fetching video info: {e}")
                 break
-                
+
             except Exception as e:
                 self.logger.error(f"Unexpected error while fetching video info for {url} (attempt {attempt + 1}): {e}", exc_info=True)
                 if attempt < self.max_token_rotation_attempts - 1:
-                    self.logger.info("Retrying with same token...")
+                    self.logger.info("Retrying...")
                 else:
                     self.logger.error("Max retry attempts reached.")
-            
-            finally:
-                if api_instance:
-                    pass 
-        
+
         return None
     
+    @property
+    def max_concurrent_crawls(self) -> int:
+        """Upper bound on useful parallel crawls: pooled sessions, limited by token and proxy capacity"""
+        capacity = min(self.session_pool.size, len(self.token_scheduler) * self.token_scheduler.max_concurrency)
+        if self.proxy_pool.enabled:
+            capacity = min(capacity, len(self.proxy_pool.proxies) * self.proxy_pool.max_sessions)
+        return max(1, capacity)
+
+    @asynccontextmanager
+    async def _lease(self) -> AsyncIterator[PooledSession]:
+        """Lease a pooled session; a failure in the block is recorded before the session is released"""
+        async with self.session_pool.lease() as session:
+            try:
+                yield session
+            except SESSION_ERRORS as e:
+                self._record_failure(session, recycle=True, error=e)
+                raise
+            except Exception as e:
+                self._record_failure(session, error=e)
+                raise
+
+    def _record_failure(self, session: PooledSession, recycle: bool = False, error: Optional[Exception] = None):
+        self.session_pool.mark_failure(session, recycle=recycle, error=str(error) if error else None)
+
+    def get_session_pool_stats(self) -> Dict[str, Any]:
+        return self.session_pool.get_stats()
+
+    def get_token_state(self) -> Dict[str, Any]:
+        return self.token_scheduler.get_state()
+
+    def get_proxy_state(self) -> Dict[str, Any]:
+        return self.proxy_pool.get_state()
+
     async def close(self):
-        pass
+        if self._warmup_task is not None:
+            await asyncio.gather(self._warmup_task, return_exceptions=True)
+        await self.session_pool.close()
+        await self.proxy_pool.stop()
 
 class TikTokCrawlError(Exception):
     pass
@@ -0,0 +1,339 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Set, Tuple
+
+from TikTokApi import TikTokApi as OfficialTikTokApi
+
+from .proxy_pool import ProxyPool, ProxyState
+from .token_scheduler import TokenScheduler
+
+
+class TikTokSessionPoolError(Exception):
+    pass
+
+
+@dataclass
+class PooledSession:
+    """One warmed TikTokApi instance (one browser session) bound to a token and proxy"""
+    session_id: int
+    api: OfficialTikTokApi
+    ms_token: str
+    proxy: Optional[ProxyState]
+    created_at: float = field(default_factory=time.monotonic)
+    uses: int = 0
+    consecutive_failures: int = 0
+    unhealthy: bool = False
+    leased_at: float = 0.0
+
+
+class TikTokSessionPool:
+    """Bounded pool of long-lived TikTokApi sessions.
+
+    Sessions are created once (at startup or on first demand) and leased to
+    requests; a session is recycled when it has failed too often, has been
+    used too many times, is too old or its token went on cooldown. Which
+    token a lease (and a new session) uses is decided by the TokenScheduler,
+    which also caps concurrent use per token; a new session goes out through
+    the proxy paired with its token in the ProxyPool, which caps sessions
+    per proxy. ``close()`` tears every browser down.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        token_scheduler: TokenScheduler,
+        proxy_pool: ProxyPool,
+        max_uses: int = 200,
+        max_failures: int = 2,
+        session_ttl: int = 1800,
+        sleep_after: int = 3,
+        acquire_timeout: float = 60.0
+    ):
+        self.size = max(1, size)
+        self.token_scheduler = token_scheduler
+        self.proxy_pool = proxy_pool
+        self.max_uses = max_uses
+        self.max_failures = max(1, max_failures)
+        self.session_ttl = session_ttl
+        self.sleep_after = sleep_after
+        self.acquire_timeout = acquire_timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._idle: Deque[PooledSession] = deque()
+        self._leased: Set[int] = set()
+        self._total = 0
+        self._closed = False
+        self._condition: Optional[asyncio.Condition] = None
+        self._session_ids = itertools.count(1)
+        self._background: Set[asyncio.Task] = set()
+        self.stats = {
+            'created': 0,
+            'creation_failures': 0,
+            'recycled': 0,
+            'leases': 0
+        }
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def start(self) -> None:
+        """Warm the pool up to its full size"""
+        slots = []
+        for _ in range(self.size - self._total):
+            slot = self._reserve_slot()
+            if slot is None:
+                break
+            slots.append(slot)
+        if not slots:
+            return
+        self._total += len(slots)
+        results = await asyncio.gather(
+            *[self._create_session(token, proxy) for token, proxy in slots], return_exceptions=True
+        )
+        for (token, proxy), result in zip(slots, results):
+            self.token_scheduler.release(token)
+            if not isinstance(result, PooledSession):
+                self.proxy_pool.release(proxy)
+        condition = self._get_condition()
+        async with condition:
+            for result in results:
+                if not isinstance(result, PooledSession):
+                    self._total -= 1
+                    self.logger.warning(f"Failed to warm TikTok session: {result}")
+                elif self._closed:
+                    # Pool closed while warming up
+                    self._total -= 1
+                    self.proxy_pool.release(result.proxy)
+                    await self._close_api(result.api)
+                else:
+                    self._idle.append(result)
+            condition.notify_all()
+        self.logger.info(f"TikTok session pool warmed: {len(self._idle)}/{self.size} sessions")
+
+    def _reserve_slot(self) -> Optional[Tuple[str, Optional[ProxyState]]]:
+        """Token and proxy for a new session, or None when neither is free (caller holds the lock)"""
+        token = self.token_scheduler.select()
+        if token is None:
+            return None
+        if not self.proxy_pool.enabled:
+            return token, None
+        proxy = self.proxy_pool.acquire(token)
+        if proxy is None:
+            self.token_scheduler.release(token)
+            return None
+        return token, proxy
+
+    async def _create_session(self, ms_token: str, proxy: Optional[ProxyState]) -> PooledSession:
+        api = OfficialTikTokApi()
+        create_sessions_kwargs = {
+            "ms_tokens": [ms_token],
+            "num_sessions": 1,
+            "headless": True,
+            "sleep_after": self.sleep_after
+        }
+        if proxy:
+            # Truyền một list chứa đối tượng proxy, vì TikTokApi có thể dùng random.choice()
+            create_sessions_kwargs["proxies"] = [proxy.playwright_proxy]
+
+        try:
+            await api.create_sessions(**create_sessions_kwargs)
+        except Exception as e:
+            self.stats['creation_failures'] += 1
+            self.proxy_pool.record_failure(proxy, str(e))
+            await self._close_api(api)
+            raise
+
+        self.stats['created'] += 1
+        return PooledSession(
+            session_id=next(self._session_ids),
+            api=api,
+            ms_token=ms_token,
+            proxy=proxy
+        )
+
+    @staticmethod
+    async def _close_api(api: OfficialTikTokApi) -> None:
+        try:
+            await api.close_sessions()
+        except Exception:
+            pass
+        try:
+            await api.stop_playwright()
+        except Exception:
+            pass
+
+    def _should_recycle(self, session: PooledSession) -> bool:
+        return (
+            session.unhealthy
+            or session.consecutive_failures >= self.max_failures
+            or session.uses >= self.max_uses
+            or time.monotonic() - session.created_at >= self.session_ttl
+            or (session.proxy is not None and not session.proxy.healthy)
+        )
+
+    def _drop_cooling_sessions(self) -> None:
+        """Retire idle sessions whose token is on cooldown or whose proxy is unhealthy (caller holds the lock)"""
+        for session in [
+            s for s in self._idle
+            if self.token_scheduler.is_cooling_down(s.ms_token) or (s.proxy is not None and not s.proxy.healthy)
+        ]:
+            self._idle.remove(session)
+            self._total -= 1
+            self.stats['recycled'] += 1
+            self.proxy_pool.release(session.proxy)
+            self._close_in_background(session)
+
+    def _take_idle(self) -> Optional[PooledSession]:
+        """Idle session whose token the scheduler allows right now (caller holds the lock)"""
+        if not self._idle:
+            return None
+        token = self.token_scheduler.select({session.ms_token for session in self._idle})
+        if token is None:
+            return None
+        for session in self._idle:
+            if session.ms_token == token:
+                self._idle.remove(session)
+                return session
+        self.token_scheduler.release(token)
+        return None
+
+    async def _acquire(self) -> PooledSession:
+        condition = self._get_condition()
+        deadline = time.monotonic() + self.acquire_timeout
+
+        while True:
+            session: Optional[PooledSession] = None
+            slot: Optional[Tuple[str, Optional[ProxyState]]] = None
+            async with condition:
+                while True:
+                    if self._closed:
+                        raise TikTokSessionPoolError("TikTok session pool is closed")
+                    self._drop_cooling_sessions()
+                    session = self._take_idle()
+                    if session is not None:
+                        break
+                    if self._total < self.size:
+                        slot = self._reserve_slot()
+                        if slot is not None:
+                            self._total += 1
+                            break
+                    if not len(self.token_scheduler):
+                        raise TikTokSessionPoolError("No valid msToken available")
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TikTokSessionPoolError("Timed out waiting for a TikTok session")
+                    try:
+                        # Wake up periodically: token cooldowns and proxy probes change state without a notify
+                        await asyncio.wait_for(condition.wait(), min(remaining, 1.0))
+                    except asyncio.TimeoutError:
+                        pass
+
+            if session is None:
+                new_token, proxy = slot
+                try:
+                    session = await self._create_session(new_token, proxy)
+                except Exception:
+                    self.token_scheduler.release(new_token)
+                    self.proxy_pool.release(proxy)
+                    async with condition:
+                        self._total -= 1
+                        condition.notify()
+                    raise
+
+            if self._should_recycle(session):
+                self.token_scheduler.release(session.ms_token)
+                await self._discard(session)
+                continue
+
+            self._leased.add(session.session_id)
+            session.uses += 1
+            session.leased_at = time.monotonic()
+            self.stats['leases'] += 1
+            return session
+
+    async def _release(self, session: PooledSession) -> None:
+        self._leased.discard(session.session_id)
+        self.token_scheduler.release(session.ms_token)
+        if self._closed or self._should_recycle(session):
+            await self._discard(session)
+            return
+
+        condition = self._get_condition()
+        async with condition:
+            self._idle.append(session)
+            condition.notify()
+
+    async def _discard(self, session: PooledSession) -> None:
+        """Drop a session from the pool and close its browser in the background"""
+        self.stats['recycled'] += 1
+        self.logger.info(
+            f"Recycling TikTok session {session.session_id} "
+            f"(uses={session.uses}, failures={session.consecutive_failures})"
+        )
+        self.proxy_pool.release(session.proxy)
+        self._close_in_background(session)
+
+        condition = self._get_condition()
+        async with condition:
+            self._total -= 1
+            condition.notify()
+
+    def _close_in_background(self, session: PooledSession) -> None:
+        task = asyncio.create_task(self._close_api(session.api))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[PooledSession]:
+        """Borrow a session for the duration of the block"""
+        session = await self._acquire()
+        try:
+            yield session
+        finally:
+            await self._release(session)
+
+    def mark_success(self, session: PooledSession) -> None:
+        session.consecutive_failures = 0
+        latency = time.monotonic() - session.leased_at
+        self.token_scheduler.record_success(session.ms_token, latency)
+        self.proxy_pool.record_success(session.proxy, latency)
+
+    def mark_failure(self, session: PooledSession, recycle: bool = False, error: Optional[str] = None) -> None:
+        """Record a failed request; recycle=True retires the session on release"""
+        session.consecutive_failures += 1
+        if recycle:
+            session.unhealthy = True
+        self.token_scheduler.record_failure(session.ms_token, time.monotonic() - session.leased_at)
+        self.proxy_pool.record_failure(session.proxy, error)
+
+    async def close(self) -> None:
+        """Close every idle session and wait for pending browser shutdowns"""
+        self._closed = True
+        condition = self._get_condition()
+        async with condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._total -= len(idle)
+            for session in idle:
+                self.proxy_pool.release(session.proxy)
+            condition.notify_all()
+
+        await asyncio.gather(*[self._close_api(session.api) for session in idle], return_exceptions=True)
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'size': self.size,
+            'total': self._total,
+            'idle': len(self._idle),
+            'leased': len(self._leased),
+            **self.stats
+        }
@@ -0,0 +1,187 @@
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+
+@dataclass
+class TokenState:
+    """Health and load of one msToken"""
+    token: str
+    in_flight: int = 0
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    latency_ewma: Optional[float] = None
+    recent_failures: Deque[float] = field(default_factory=deque)
+    cooldown_until: float = 0.0
+    cooldowns: int = 0
+    last_used: float = 0.0
+
+    @property
+    def success_rate(self) -> float:
+        total = self.successes + self.failures
+        # Chưa có dữ liệu thì coi như token tốt
+        return self.successes / total if total else 1.0
+
+    def is_cooling_down(self, now: float) -> bool:
+        return now < self.cooldown_until
+
+
+class TokenScheduler:
+    """Hands out msTokens by health and load.
+
+    Every token tracks its success rate, latency (EWMA), recent failures and
+    in-flight uses. A token with too many failures inside the failure window
+    is put on a cooldown that doubles on each repeat. Selection is either
+    least-loaded (fewest in-flight uses, then best success rate and latency)
+    or weighted-random by success rate / latency; each token's concurrent
+    use is capped by ``max_concurrency``.
+    """
+
+    STRATEGIES = ("least_loaded", "weighted")
+
+    def __init__(
+        self,
+        tokens: Iterable[str],
+        strategy: str = "least_loaded",
+        max_concurrency: int = 1,
+        failure_threshold: int = 3,
+        failure_window: float = 300.0,
+        cooldown: float = 120.0,
+        max_cooldown: float = 1800.0,
+        latency_alpha: float = 0.3
+    ):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown token selection strategy: {strategy}")
+
+        self.strategy = strategy
+        self.max_concurrency = max(1, max_concurrency)
+        self.failure_threshold = max(1, failure_threshold)
+        self.failure_window = failure_window
+        self.cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self.latency_alpha = latency_alpha
+        self.tokens: Dict[str, TokenState] = {}
+        for token in tokens:
+            if token and token not in self.tokens:
+                self.tokens[token] = TokenState(token=token)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def _available(self, candidates: Optional[Iterable[str]], now: float) -> List[TokenState]:
+        pool = self.tokens.values() if candidates is None else [
+            self.tokens[token] for token in candidates if token in self.tokens
+        ]
+        return [
+            state for state in pool
+            if not state.is_cooling_down(now) and state.in_flight < self.max_concurrency
+        ]
+
+    def select(self, candidates: Optional[Iterable[str]] = None) -> Optional[str]:
+        """Pick a usable token (optionally among candidates) and count it as in flight"""
+        now = time.monotonic()
+        available = self._available(candidates, now)
+        if not available:
+            return None
+
+        if self.strategy == "weighted":
+            weights = [
+                max(state.success_rate, 0.05) / (1.0 + (state.latency_ewma or 0.0))
+                for state in available
+            ]
+            chosen = random.choices(available, weights=weights, k=1)[0]
+        else:
+            chosen = min(
+                available,
+                key=lambda state: (
+                    state.in_flight,
+                    -state.success_rate,
+                    state.latency_ewma or 0.0,
+                    state.last_used
+                )
+            )
+
+        chosen.in_flight += 1
+        chosen.last_used = now
+        return chosen.token
+
+    def release(self, token: str) -> None:
+        state = self.tokens.get(token)
+        if state is not None and state.in_flight > 0:
+            state.in_flight -= 1
+
+    def is_cooling_down(self, token: str) -> bool:
+        state = self.tokens.get(token)
+        return state is not None and state.is_cooling_down(time.monotonic())
+
+    def record_success(self, token: str, latency: Optional[float] = None) -> None:
+        state = self.tokens.get(token)
+        if state is None:
+            return
+        state.successes += 1
+        state.consecutive_failures = 0
+        if latency is not None:
+            self._update_latency(state, latency)
+
+    def record_failure(self, token: str, latency: Optional[float] = None) -> None:
+        """Record a failed use; puts the token on cooldown when it fails too often"""
+        state = self.tokens.get(token)
+        if state is None:
+            return
+        now = time.monotonic()
+        state.failures += 1
+        state.consecutive_failures += 1
+        if latency is not None:
+            self._update_latency(state, latency)
+
+        state.recent_failures.append(now)
+        while state.recent_failures and now - state.recent_failures[0] > self.failure_window:
+            state.recent_failures.popleft()
+
+        if len(state.recent_failures) >= self.failure_threshold:
+            state.cooldowns += 1
+            duration = min(self.cooldown * 2 ** (state.cooldowns - 1), self.max_cooldown)
+            state.cooldown_until = now + duration
+            state.recent_failures.clear()
+
+    def _update_latency(self, state: TokenState, latency: float) -> None:
+        if state.latency_ewma is None:
+            state.latency_ewma = latency
+        else:
+            state.latency_ewma += self.latency_alpha * (latency - state.latency_ewma)
+
+    @staticmethod
+    def _mask(token: str) -> str:
+        return f"{token[:6]}...{token[-4:]}" if len(token) > 12 else "***"
+
+    def get_state(self) -> Dict[str, Any]:
+        """Per-token health, with tokens masked"""
+        now = time.monotonic()
+        tokens = []
+        for state in self.tokens.values():
+            while state.recent_failures and now - state.recent_failures[0] > self.failure_window:
+                state.recent_failures.popleft()
+            cooling_down = state.is_cooling_down(now)
+            tokens.append({
+                'token': self._mask(state.token),
+                'in_flight': state.in_flight,
+                'successes': state.successes,
+                'failures': state.failures,
+                'success_rate': round(state.success_rate, 4),
+                'consecutive_failures': state.consecutive_failures,
+                'recent_failures': len(state.recent_failures),
+                'latency_ewma': round(state.latency_ewma, 3) if state.latency_ewma is not None else None,
+                'cooling_down': cooling_down,
+                'cooldown_remaining': round(state.cooldown_until - now, 1) if cooling_down else 0.0,
+                'cooldowns': state.cooldowns
+            })
+        return {
+            'strategy': self.strategy,
+            'max_concurrency_per_token': self.max_concurrency,
+            'available': len(self._available(None, now)),
+            'total': len(self.tokens),
+            'tokens': tokens
+        }
@@ -1,18 +1,35 @@
 import re
-from typing import List, Dict, Any
+import logging
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
 from urllib.parse import urlparse
+import httpx
 from ..models import Comment
 
 class ValidationService:
     """Service for validating input data and URLs"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        short_link_cache_size: int = 10000,
+        resolve_timeout: float = 10.0,
+        proxies: Optional[Dict[str, str]] = None
+    ):
         self.tiktok_domains = [
             'tiktok.com',
             'www.tiktok.com',
             'm.tiktok.com',
-            'vm.tiktok.com'
+            'vm.tiktok.com',
+            'vt.tiktok.com'
         ]
+        # Link rút gọn (vm.tiktok.com/xxx, vt.tiktok.com/xxx, tiktok.com/t/xxx) chuyển hướng tới URL video
+        self.short_link_domains = {'vm.tiktok.com', 'vt.tiktok.com'}
+        self.short_link_cache_size = short_link_cache_size
+        self.resolve_timeout = resolve_timeout
+        self.proxies = proxies
+        self._short_link_cache: "OrderedDict[str, str]" = OrderedDict()
+        self.short_link_stats = {'hits': 0, 'resolved': 0, 'failed': 0}
+        self.logger = logging.getLogger(__name__)
         
         # Vietnamese text patterns
         self.vietnamese_pattern = re.compile(r'[àáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđ]', re.IGNORECASE)
@@ -30,7 +47,7 @@ class ValidationService:
                 }
             
             # Check if it's a video URL
-            if '/video/' not in parsed.path and '/@' not in parsed.path:
+            if '/video/' not in parsed.path and '/@' not in parsed.path and not self._is_short_link(url):
                 return {
                     'valid': False,
                     'error': 'URL không phải là link video TikTok'
@@ -48,6 +65,82 @@ class ValidationService:
                 'error': f'URL không hợp lệ: {str(e)}'
             }
     
+    async def canonicalize_tiktok_url(self, url: str) -> Dict[str, Any]:
+        """Validate a TikTok URL and resolve it to its numeric video id.
+
+        Short links are resolved once through their redirect and remembered.
+        Returns the validation dict plus ``canonical_url``; ``video_id`` is
+        the key every cache and storage layer uses for the video.
+        """
+        validation = self.validate_tiktok_url(url)
+        if not validation['valid']:
+            return validation
+
+        resolved_url = url
+        if not validation['video_id'] and self._is_short_link(url):
+            resolved_url = await self._resolve_short_link(url)
+            if not resolved_url:
+                return {
+                    'valid': False,
+                    'error': 'Không thể phân giải link rút gọn TikTok'
+                }
+
+        video_id = self._extract_video_id(resolved_url)
+        if not video_id:
+            return {
+                'valid': False,
+                'error': 'URL không chứa ID video TikTok'
+            }
+
+        username = self._extract_username(resolved_url)
+        if username:
+            canonical_url = f"https://www.tiktok.com/@{username}/video/{video_id}"
+        else:
+            canonical_url = resolved_url.split('?')[0]
+
+        return {
+            'valid': True,
+            'video_id': video_id,
+            'username': username,
+            'canonical_url': canonical_url
+        }
+
+    def _is_short_link(self, url: str) -> bool:
+        parsed = urlparse(url)
+        return parsed.netloc.lower() in self.short_link_domains or parsed.path.startswith('/t/')
+
+    async def _resolve_short_link(self, url: str) -> Optional[str]:
+        """Follow a short link's redirect; results are kept in a bounded LRU"""
+        key = url.split('?')[0].rstrip('/')
+        if key in self._short_link_cache:
+            self._short_link_cache.move_to_end(key)
+            self.short_link_stats['hits'] += 1
+            return self._short_link_cache[key]
+
+        try:
+            async with httpx.AsyncClient(
+                follow_redirects=True, timeout=self.resolve_timeout, proxies=self.proxies
+            ) as client:
+                response = await client.head(url)
+            resolved = str(response.url)
+        except Exception as e:
+            self.short_link_stats['failed'] += 1
+            self.logger.warning(f"Could not resolve TikTok short link {url}: {e}")
+            return None
+
+        if not self._extract_video_id(resolved):
+            self.short_link_stats['failed'] += 1
+            return None
+
+        self.short_link_stats['resolved'] += 1
+        self._short_link_cache[key] = resolved
+        if len(self._short_link_cache) > self.short_link_cache_size:
+            self._short_link_cache.popitem(last=False)
+        return resolved
+
+    def get_short_link_stats(self) -> Dict[str, int]:
+        return {'cached': len(self._short_link_cache), **self.short_link_stats}
+
     def validate_comment_data(self, comment_data: Dict[str, Any]) -> Dict[str, Any]:
         """Validate comment data structure"""
         required_fields = ['comment_text']
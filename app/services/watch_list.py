@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+
+@dataclass
+class WatchEntry:
+    url: str
+    interval: int  # Seconds between refreshes
+    added_at: str
+    next_run: float = 0.0  # time.monotonic() of the next refresh
+    last_refreshed_at: Optional[str] = None
+    last_result: Optional[Dict[str, Any]] = None
+    last_error: Optional[str] = None
+    refresh_count: int = 0
+    running: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'interval': self.interval,
+            'added_at': self.added_at,
+            'last_refreshed_at': self.last_refreshed_at,
+            'next_refresh_in': max(0.0, round(self.next_run - time.monotonic(), 1)),
+            'last_result': self.last_result,
+            'last_error': self.last_error,
+            'refresh_count': self.refresh_count,
+            'running': self.running
+        }
+
+
+class WatchListService:
+    """Tracked videos refreshed periodically in the background.
+
+    ``refresh`` is an async callback that re-analyzes one URL (incrementally)
+    and returns a small summary dict. The list of URLs, intervals and next
+    refresh times is persisted to ``path`` so it survives restarts; entries
+    that became due while the service was down are spread over
+    ``min_interval`` instead of all being recrawled at startup.
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[str], Awaitable[Dict[str, Any]]],
+        path: str,
+        default_interval: int = 3600,
+        min_interval: int = 300,
+        max_concurrency: int = 2
+    ):
+        self.refresh = refresh
+        self.path = path
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_concurrency = max(1, max_concurrency)
+        self.logger = logging.getLogger(__name__)
+
+        self.entries: Dict[str, WatchEntry] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._persist_lock: Optional[asyncio.Lock] = None
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+            now, wall_now = time.monotonic(), time.time()
+            for item in items:
+                delay = item.get('next_run_at', wall_now) - wall_now
+                if delay <= 0:
+                    delay = random.uniform(0, self.min_interval)
+                self.entries[item['url']] = WatchEntry(
+                    url=item['url'],
+                    interval=item['interval'],
+                    added_at=item.get('added_at', datetime.now().isoformat()),
+                    next_run=now + delay,
+                    last_refreshed_at=item.get('last_refreshed_at'),
+                    refresh_count=item.get('refresh_count', 0)
+                )
+        except Exception as e:
+            self.logger.warning(f"Could not load watch list from {self.path}: {e}")
+
+    def _get_persist_lock(self) -> asyncio.Lock:
+        if self._persist_lock is None:
+            self._persist_lock = asyncio.Lock()
+        return self._persist_lock
+
+    def _write(self, items: List[Dict[str, Any]]) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(items, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    async def _persist(self) -> None:
+        # next_run is monotonic; store it as wall-clock time so it means something after a restart
+        offset = time.time() - time.monotonic()
+        items = [
+            {
+                'url': e.url,
+                'interval': e.interval,
+                'added_at': e.added_at,
+                'next_run_at': e.next_run + offset,
+                'last_refreshed_at': e.last_refreshed_at,
+                'refresh_count': e.refresh_count
+            }
+            for e in self.entries.values()
+        ]
+        # The lock is FIFO, so snapshots are written in the order they were taken
+        async with self._get_persist_lock():
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, self._write, items)
+            except Exception as e:
+                self.logger.warning(f"Could not persist watch list to {self.path}: {e}")
+
+    async def add(self, url: str, interval: Optional[int] = None) -> WatchEntry:
+        """Watch a URL (or update its interval); the first refresh runs right away"""
+        interval = max(self.min_interval, interval or self.default_interval)
+        entry = self.entries.get(url)
+        if entry is None:
+            entry = WatchEntry(url=url, interval=interval, added_at=datetime.now().isoformat(), next_run=time.monotonic())
+            self.entries[url] = entry
+        else:
+            entry.interval = interval
+            entry.next_run = min(entry.next_run, time.monotonic() + interval)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        await self._persist()
+        return entry
+
+    async def remove(self, url: str) -> bool:
+        if self.entries.pop(url, None) is None:
+            return False
+        await self._persist()
+        return True
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [entry.to_dict() for entry in self.entries.values()]
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._load()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        # Refreshes can take minutes (a whole crawl); cancel them too instead of waiting
+        tasks = [self._task, *self._running]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            for entry in list(self.entries.values()):
+                if len(self._running) >= self.max_concurrency:
+                    break
+                if not entry.running and entry.next_run <= now:
+                    entry.running = True
+                    task = asyncio.create_task(self._refresh_entry(entry))
+                    self._running.add(task)
+                    task.add_done_callback(self._running.discard)
+
+            # Sleep until the next entry is due, a refresh finishes or a URL is added
+            pending = [e.next_run for e in self.entries.values() if not e.running]
+            timeout = max(0.5, min(pending) - time.monotonic()) if pending else 60.0
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), min(timeout, 60.0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _refresh_entry(self, entry: WatchEntry) -> None:
+        try:
+            entry.last_result = await self.refresh(entry.url)
+            entry.last_error = None
+        except Exception as e:
+            self.logger.warning(f"Watch list refresh failed for {entry.url}: {e}")
+            entry.last_error = str(e)
+        finally:
+            entry.running = False
+            entry.refresh_count += 1
+            entry.last_refreshed_at = datetime.now().isoformat()
+            entry.next_run = time.monotonic() + entry.interval
+            if self._wakeup is not None:
+                self._wakeup.set()
+            if entry.url in self.entries:
+                await self._persist()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'watched': len(self.entries),
+            'refreshing': len(self._running)
+        }
@@ -47,6 +47,40 @@ def generate_content_hash(content: str) -> str:
     normalized = normalize_vietnamese_text(content).lower()
     return hashlib.md5(normalized.encode('utf-8')).hexdigest()
 
+# Word runs and single other characters (emoji, punctuation, URL separators)
+_TOKEN_PIECE_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+def _piece_token_counts(text: str, tokens_per_word: float):
+    """(start, end, estimated tokens) of each word run / symbol in text.
+
+    A short word counts tokens_per_word; long runs (URL parts, numbers,
+    glued hashtags) are split by the subword tokenizer, so they count one
+    token per 3 characters; every other symbol counts one token.
+    """
+    for match in _TOKEN_PIECE_PATTERN.finditer(text):
+        piece = match.group()
+        if not piece[0].isalnum() and piece[0] != '_':
+            count = 1.0
+        else:
+            count = max(tokens_per_word, len(piece) / 3)
+        yield match.start(), match.end(), count
+
+def estimate_token_count(text: str, tokens_per_word: float = 1.5) -> int:
+    """Rough (on the high side) subword token count for Vietnamese text, including [CLS]/[SEP]"""
+    return int(sum(count for _, _, count in _piece_token_counts(text, tokens_per_word))) + 2
+
+def truncate_to_token_limit(text: str, max_tokens: int, tokens_per_word: float = 1.5) -> str:
+    """Cut text to the prefix that fits in max_tokens (unchanged if it already fits)"""
+    budget = max_tokens - 2
+    total = 0.0
+    for start, end, count in _piece_token_counts(text, tokens_per_word):
+        if total + count > budget:
+            # Keep the part of a long run that still fits (3 characters per token)
+            keep = int((budget - total) * 3) if end - start > 3 else 0
+            return text[:start + min(keep, end - start)].rstrip()
+        total += count
+    return text
+
 def detect_spam_indicators(text: str) -> Dict[str, Any]:
     """Detect various spam indicators in text"""
     indicators = {